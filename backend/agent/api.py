@@ -1,17 +1,20 @@
 import asyncio
-import json
 import os
+import re
 import traceback
 import uuid
 from datetime import datetime, timezone
+from functools import lru_cache
+from inspect import iscoroutinefunction
 from pathlib import Path
-from typing import List, Optional
+from typing import List, Optional, Tuple
 
+import orjson
 from fastapi import (APIRouter, Body, Depends, File, Form, HTTPException,
                      Query, Request, UploadFile)
 from pydantic import BaseModel
 
-from sandbox.sandbox import create_sandbox, delete_sandbox
+from sandbox.sandbox import delete_sandbox, sandbox_pool
 from services import redis
 from services.supabase import DBConnection
 from utils.auth_utils import get_current_user_id_from_jwt
@@ -23,6 +26,16 @@ router = APIRouter()
 db = None
 instance_id = None
 
+# Max number of agent runs stopped concurrently during shutdown cleanup
+CLEANUP_CONCURRENCY = 32
+# Listing attempts used to confirm uploaded files before giving up on them
+UPLOAD_VERIFY_ATTEMPTS = 3
+# Seconds a granted thread access check is served from Redis
+THREAD_ACCESS_CACHE_TTL = 30
+
+_PREVIEW_URL_RE = re.compile(r"url='([^']+)'")
+_PREVIEW_TOKEN_RE = re.compile(r"token='([^']+)'")
+
 
 class AgentStartRequest(BaseModel):
     # Will be set from config.MODEL_TO_USE in the endpoint
@@ -39,6 +52,14 @@ class InitiateAgentResponse(BaseModel):
     agent_run_id: Optional[str] = None
 
 
+@lru_cache(maxsize=128)
+def resolve_model_name(model_name: Optional[str]) -> str:
+    """Map a requested model (or the configured default) to its canonical name."""
+    if model_name is None:
+        model_name = config.MODEL_TO_USE
+    return MODEL_NAME_ALIASES.get(model_name, model_name)
+
+
 def initialize(_db: DBConnection, _instance_id: str = None):
     global db, instance_id
     db = _db
@@ -55,22 +76,34 @@ async def cleanup():
     logger.info("Starting cleanup of agent API resources")
     try:
         if instance_id:  # Ensure instance_id is set
-            running_keys = await redis.keys(f"active_run:{instance_id}:*")
-            logger.info(
-                f"Found {len(running_keys)} running agent runs for instance {instance_id} to clean up"
-            )
-
-            for key in running_keys:
+            agent_run_ids = []
+            async for key in redis.scan_iter(f"active_run:{instance_id}:*", count=500):
                 # Key format: active_run:{instance_id}:{agent_run_id}
                 parts = key.split(":")
                 if len(parts) == 3:
-                    agent_run_id = parts[2]
+                    agent_run_ids.append(parts[2])
+                else:
+                    logger.warning(f"Unexpected key format found: {key}")
+            logger.info(
+                f"Found {len(agent_run_ids)} running agent runs for instance {instance_id} to clean up"
+            )
+
+            semaphore = asyncio.Semaphore(CLEANUP_CONCURRENCY)
+
+            async def _stop(agent_run_id: str):
+                async with semaphore:
                     await stop_agent_run(
                         agent_run_id,
                         error_message=f"Instance {instance_id} shutting down",
                     )
-                else:
-                    logger.warning(f"Unexpected key format found: {key}")
+
+            results = await asyncio.gather(
+                *(_stop(agent_run_id) for agent_run_id in agent_run_ids),
+                return_exceptions=True,
+            )
+            for agent_run_id, result in zip(agent_run_ids, results):
+                if isinstance(result, Exception):
+                    logger.error(f"Failed to stop agent run {agent_run_id}: {result}")
         else:
             logger.warning(
                 "Instance ID not set, cannot clean up instance-specific agent runs."
@@ -85,10 +118,16 @@ async def stop_agent_run(agent_run_id: str, error_message: Optional[str] = None)
     final_status = "failed" if error_message else "stopped"
 
     response_list_key = f"agent_run:{agent_run_id}:responses"
+    status_key = f"agent_run:{agent_run_id}:status"
     all_responses = []
     try:
-        all_responses_json = await redis.lrange(response_list_key, 0, -1)
-        all_responses = [json.loads(r) for r in all_responses_json]
+        redis_client = await redis.get_client()
+        async with redis_client.pipeline(transaction=False) as pipe:
+            pipe.lrange(response_list_key, 0, -1)
+            pipe.set(status_key, final_status, ex=redis.REDIS_KEY_TTL)
+            pipe.expire(response_list_key, redis.REDIS_KEY_TTL)
+            all_responses_json, _, _ = await pipe.execute()
+        all_responses = [orjson.loads(r) for r in all_responses_json]
         logger.info(
             f"Fetched {len(all_responses)} responses from Redis for DB update on stop/fail: {agent_run_id}"
         )
@@ -99,39 +138,24 @@ async def stop_agent_run(agent_run_id: str, error_message: Optional[str] = None)
 
 
 async def verify_thread_access(client, thread_id: str, user_id: str):
-    thread_result = (
-        await client.table("threads")
-        .select("*,project_id")
-        .eq("thread_id", thread_id)
-        .execute()
-    )
-    if not thread_result.data or len(thread_result.data) == 0:
-        raise HTTPException(status_code=404, detail="Thread not found")
-    thread_data = thread_result.data[0]
-    # Check if project is public
-    project_id = thread_data.get("project_id")
-    if project_id:
-        project_result = (
-            await client.table("projects")
-            .select("is_public")
-            .eq("project_id", project_id)
-            .execute()
-        )
-        if project_result.data and len(project_result.data) > 0:
-            if project_result.data[0].get("is_public"):
-                return True
-    account_id = thread_data.get("account_id")
-    if account_id:
-        account_user_result = (
-            await client.schema("basejump")
-            .from_("account_user")
-            .select("account_role")
-            .eq("user_id", user_id)
-            .eq("account_id", account_id)
-            .execute()
-        )
-        if account_user_result.data and len(account_user_result.data) > 0:
+    cache_key = f"thread_access:{thread_id}:{user_id}"
+    try:
+        if await redis.get(cache_key):
             return True
+    except Exception as e:
+        logger.warning(f"Failed to read thread access cache for {thread_id}: {e}")
+    access_result = await client.rpc(
+        "verify_thread_access", {"p_thread_id": thread_id, "p_user_id": user_id}
+    ).execute()
+    access = access_result.data or {}
+    if not access.get("found"):
+        raise HTTPException(status_code=404, detail="Thread not found")
+    if access.get("authorized"):
+        try:
+            await redis.set(cache_key, "1", ex=THREAD_ACCESS_CACHE_TTL)
+        except Exception as e:
+            logger.warning(f"Failed to cache thread access for {thread_id}: {e}")
+        return True
     raise HTTPException(status_code=403, detail="Not authorized to access this thread")
 
 
@@ -184,6 +208,99 @@ async def verify_thread_access(client, thread_id: str, user_id: str):
 #             f"Finished background naming task for project: {project_id}")
 
 
+def _preview_link_field(link, attr: str, pattern: re.Pattern) -> Optional[str]:
+    """Read a preview link attribute, falling back to parsing its repr."""
+    value = getattr(link, attr, None)
+    if value is not None:
+        return value
+    match = pattern.search(str(link))
+    return match.group(1) if match else None
+
+
+@lru_cache(maxsize=None)
+def _fs_method_is_async(fs_type: type, method: str) -> bool:
+    """Probe once per sandbox filesystem class whether a method is a coroutine."""
+    return iscoroutinefunction(getattr(fs_type, method, None))
+
+
+async def _call_fs_method(fs, method: str, *args):
+    if _fs_method_is_async(type(fs), method):
+        return await getattr(fs, method)(*args)
+    return await asyncio.to_thread(getattr(fs, method), *args)
+
+
+async def _upload_file_to_sandbox(sandbox, file: UploadFile) -> Tuple[str, str, bool]:
+    """Upload one file to the sandbox workspace, returning (filename, path, uploaded)."""
+    safe_filename = file.filename.replace("/", "_").replace("\\", "_")
+    target_path = f"/workspace/{safe_filename}"
+    try:
+        logger.info(
+            f"Attempting to upload {safe_filename} to {target_path} in sandbox {sandbox.id}"
+        )
+        fs = getattr(sandbox, "fs", None)
+        if hasattr(fs, "upload_stream"):
+            # Hand over the spooled upload as-is instead of buffering it in memory
+            await file.seek(0)
+            await _call_fs_method(fs, "upload_stream", file.file, target_path)
+            logger.debug(f"Called sandbox.fs.upload_stream for {target_path}")
+        elif hasattr(fs, "upload_file"):
+            content = await file.read()
+            await _call_fs_method(fs, "upload_file", content, target_path)
+            logger.debug(f"Called sandbox.fs.upload_file for {target_path}")
+        else:
+            raise NotImplementedError(
+                "Suitable upload method not found on sandbox object."
+            )
+        return safe_filename, target_path, True
+    except Exception as upload_error:
+        logger.error(
+            f"Error during sandbox upload call for {safe_filename}: {str(upload_error)}",
+            exc_info=True,
+        )
+        return safe_filename, target_path, False
+    finally:
+        await file.close()
+
+
+async def _verify_sandbox_uploads(
+    sandbox, uploads: List[Tuple[str, str, bool]]
+) -> Tuple[List[str], List[str]]:
+    """Check all uploaded files with a single directory listing."""
+    successful_uploads = []
+    failed_uploads = [safe_filename for safe_filename, _, ok in uploads if not ok]
+    uploaded = [(name, path) for name, path, ok in uploads if ok]
+    if not uploaded:
+        return successful_uploads, failed_uploads
+
+    # List right away and only back off briefly if some files are not visible yet
+    expected = {name for name, _ in uploaded}
+    file_names_in_dir = set()
+    for attempt in range(UPLOAD_VERIFY_ATTEMPTS):
+        try:
+            files_in_dir = await asyncio.to_thread(sandbox.fs.list_files, "/workspace")
+            file_names_in_dir = {f.name for f in files_in_dir}
+        except Exception as verify_error:
+            logger.error(
+                f"Error verifying uploaded files in /workspace: {str(verify_error)}",
+                exc_info=True,
+            )
+        if expected <= file_names_in_dir or attempt == UPLOAD_VERIFY_ATTEMPTS - 1:
+            break
+        await asyncio.sleep(0.02 * 2**attempt)
+    for safe_filename, target_path in uploaded:
+        if safe_filename in file_names_in_dir:
+            successful_uploads.append(target_path)
+            logger.info(
+                f"Successfully uploaded and verified file {safe_filename} to sandbox path {target_path}"
+            )
+        else:
+            logger.error(
+                f"Verification failed for {safe_filename}: File not found in /workspace after upload attempt."
+            )
+            failed_uploads.append(safe_filename)
+    return successful_uploads, failed_uploads
+
+
 @router.post("/agent/initiate", response_model=InitiateAgentResponse)
 async def initiate_agent_with_files(
     prompt: str = Form(...),
@@ -205,239 +322,129 @@ async def initiate_agent_with_files(
         raise HTTPException(
             status_code=500, detail="Agent API not initialized with instance ID"
         )
-    logger.info(f"Original model_name from request: {model_name}")
-    if model_name is None:
-        model_name = config.MODEL_TO_USE
-        logger.info(f"Using model from config: {model_name}")
-    resolved_model = MODEL_NAME_ALIASES.get(model_name, model_name)
-    model_name = resolved_model
+    logger.info("Original model_name from request: %s", model_name)
+    model_name = resolve_model_name(model_name)
 
     logger.info(
-        f"Starting new agent in agent builder mode: {is_agent_builder}, target_agent_id: {target_agent_id}"
+        "Starting new agent in agent builder mode: %s, target_agent_id: %s",
+        is_agent_builder,
+        target_agent_id,
     )
     logger.info(
-        f"[\033[91mDEBUG\033[0m] Initiating new agent with prompt and {len(files)} files (Instance: {instance_id}), model: {model_name}, enable_thinking: {enable_thinking}"
+        "[\033[91mDEBUG\033[0m] Initiating new agent with prompt and %d files (Instance: %s), model: %s, enable_thinking: %s",
+        len(files),
+        instance_id,
+        model_name,
+        enable_thinking,
     )
     client = await db.client
     account_id = user_id
+    now_iso = datetime.now(timezone.utc).isoformat()
     agent_config = None
     try:
-        # 1. Create Project
+        # 1. Create Sandbox
+        # The sandbox only needs project_id, so it is provisioned before any row exists
         placeholder_name = f"{prompt[:30]}..." if len(prompt) > 30 else prompt
-        project = (
-            await client.table("projects")
-            .insert(
-                {
-                    "project_id": str(uuid.uuid4()),
-                    "account_id": account_id,
-                    "name": placeholder_name,
-                    "created_at": datetime.now(timezone.utc).isoformat(),
-                }
-            )
-            .execute()
-        )
-        project_id = project.data[0]["project_id"]
-        logger.info(f"Created new project: {project_id}")
-        # 2. Create Sandbox
+        project_id = str(uuid.uuid4())
         sandbox_id = None
         try:
-            sandbox_pass = str(uuid.uuid4())
-            sandbox = create_sandbox(sandbox_pass, project_id)
+            sandbox, sandbox_pass = await sandbox_pool.acquire(project_id)
             sandbox_id = sandbox.id
             logger.info(f"Created new sandbox {sandbox_id} for project {project_id}")
 
-            vnc_link = sandbox.get_preview_link(6080)
-            website_link = sandbox.get_preview_link(8080)
-            vnc_url = (
-                vnc_link.url
-                if hasattr(vnc_link, "url")
-                else str(vnc_link).split("url='")[1].split("'")[0]
-            )
-            website_url = (
-                website_link.url
-                if hasattr(website_link, "url")
-                else str(website_link).split("url='")[1].split("'")[0]
+            vnc_link, website_link = await asyncio.gather(
+                asyncio.to_thread(sandbox.get_preview_link, 6080),
+                asyncio.to_thread(sandbox.get_preview_link, 8080),
             )
-            token = None
-            if hasattr(vnc_link, "token"):
-                token = vnc_link.token
-            elif "token='" in str(vnc_link):
-                token = str(vnc_link).split("token='")[1].split("'")[0]
+            vnc_url = _preview_link_field(vnc_link, "url", _PREVIEW_URL_RE)
+            website_url = _preview_link_field(website_link, "url", _PREVIEW_URL_RE)
+            token = _preview_link_field(vnc_link, "token", _PREVIEW_TOKEN_RE)
         except Exception as e:
             logger.error(f"Error creating sandbox: {str(e)}")
-            await client.table("projects").delete().eq(
-                "project_id", project_id
-            ).execute()
             if sandbox_id:
                 try:
                     await delete_sandbox(sandbox_id)
                 except Exception as e:
                     pass
             raise Exception("Failed to create sandbox")
-        update_result = (
-            await client.table("projects")
-            .update(
-                {
-                    "sandbox": {
-                        "id": sandbox_id,
-                        "pass": sandbox_pass,
-                        "vnc_preview": vnc_url,
-                        "sandbox_url": website_url,
-                        "token": token,
-                    }
-                }
+        # asyncio.create_task(generate_and_update_project_name(
+        #     project_id=project_id, prompt=prompt))
+        message_parts = [prompt]
+        # 2. Upload file to sandbox (if any)
+        if files:
+            uploads = await asyncio.gather(
+                *(_upload_file_to_sandbox(sandbox, file) for file in files if file.filename)
             )
-            .eq("project_id", project_id)
-            .execute()
-        )
-        if not update_result.data:
-            logger.error(
-                f"Failed to update project {project_id} with new sandbox {sandbox_id}"
+            successful_uploads, failed_uploads = await _verify_sandbox_uploads(
+                sandbox, uploads
             )
-            if sandbox_id:
-                try:
-                    await delete_sandbox(sandbox_id)
-                except Exception as e:
-                    logger.error(f"Error deleting sandbox: {str(e)}")
-            raise Exception("Database update failed")
-        # 3. Create Thread
-        thread_data = {
-            "thread_id": str(uuid.uuid4()),
-            "project_id": project_id,
-            "account_id": account_id,
-            "created_at": datetime.now(timezone.utc).isoformat(),
-        }
-        if agent_config:
-            thread_data["agent_id"] = agent_config["agent_id"]
-            logger.info(f"Storing agent_id {agent_config['agent_id']} in thread")
+            if successful_uploads:
+                if prompt:
+                    message_parts.append("\n\n")
+                message_parts.extend(
+                    f"[Uploaded File: {file_path}]\n" for file_path in successful_uploads
+                )
+            if failed_uploads:
+                message_parts.append("\n\nThe following files failed to upload:\n")
+                message_parts.extend(f"- {failed_file}\n" for failed_file in failed_uploads)
+        message_content = "".join(message_parts)
+        message_payload = {"role": "user", "content": message_content}
+
+        # 3. Create project, thread, initial message and agent run in one transaction
+        thread_metadata = {}
         if is_agent_builder:
-            thread_data["metadata"] = {
+            thread_metadata = {
                 "is_agent_builder": True,
                 "target_agent_id": target_agent_id,
             }
             logger.info(
                 f"Storing agent builder metadata in thread: target_agent_id={target_agent_id}"
             )
-
-        thread = await client.table("threads").insert(thread_data).execute()
-        thread_id = thread.data[0]["thread_id"]
-        logger.info(f"Created new thread: {thread_id}")
-        # asyncio.create_task(generate_and_update_project_name(
-        #     project_id=project_id, prompt=prompt))
-        message_content = prompt
-        # 4. Upload file to sandbox (if any)
-        if files:
-            successful_uploads = []
-            failed_uploads = []
-            for file in files:
-                if file.filename:
-                    try:
-                        safe_filename = file.filename.replace("/", "_").replace(
-                            "\\", "_"
-                        )
-                        target_path = f"/workspace/{safe_filename}"
-                        logger.info(
-                            f"Attempting to upload {safe_filename} to {target_path} in sandbox {sandbox_id}"
-                        )
-                        content = await file.read()
-                        upload_successful = False
-                        try:
-                            if hasattr(sandbox, "fs") and hasattr(
-                                sandbox.fs, "upload_file"
-                            ):
-                                import inspect
-
-                                if inspect.iscoroutinefunction(sandbox.fs.upload_file):
-                                    await sandbox.fs.upload_file(content, target_path)
-                                else:
-                                    sandbox.fs.upload_file(content, target_path)
-                                logger.debug(
-                                    f"Called sandbox.fs.upload_file for {target_path}"
-                                )
-                                upload_successful = True
-                            else:
-                                raise NotImplementedError(
-                                    "Suitable upload method not found on sandbox object."
-                                )
-                        except Exception as upload_error:
-                            logger.error(
-                                f"Error during sandbox upload call for {safe_filename}: {str(upload_error)}",
-                                exc_info=True,
-                            )
-                        if upload_successful:
-                            try:
-                                await asyncio.sleep(0.2)
-                                parent_dir = os.path.dirname(target_path)
-                                files_in_dir = sandbox.fs.list_files(parent_dir)
-                                file_names_in_dir = [f.name for f in files_in_dir]
-                                if safe_filename in file_names_in_dir:
-                                    successful_uploads.append(target_path)
-                                    logger.info(
-                                        f"Successfully uploaded and verified file {safe_filename} to sandbox path {target_path}"
-                                    )
-                                else:
-                                    logger.error(
-                                        f"Verification failed for {safe_filename}: File not found in {parent_dir} after upload attempt."
-                                    )
-                                    failed_uploads.append(safe_filename)
-                            except Exception as verify_error:
-                                logger.error(
-                                    f"Error verifying file {safe_filename} after upload: {str(verify_error)}",
-                                    exc_info=True,
-                                )
-                                failed_uploads.append(safe_filename)
-                        else:
-                            failed_uploads.append(safe_filename)
-                    except Exception as file_error:
-                        logger.error(
-                            f"Error processing file {file.filename}: {str(file_error)}",
-                            exc_info=True,
-                        )
-                        failed_uploads.append(file.filename)
-                    finally:
-                        await file.close()
-            if successful_uploads:
-                message_content += "\n\n" if message_content else ""
-                for file_path in successful_uploads:
-                    message_content += f"[Uploaded File: {file_path}]\n"
-            if failed_uploads:
-                message_content += "\n\nThe following files failed to upload:\n"
-                for failed_file in failed_uploads:
-                    message_content += f"- {failed_file}\n"
-        # 5. Add initial user message to thread
-        message_id = str(uuid.uuid4())
-        message_payload = {"role": "user", "content": message_content}
-        await client.table("messages").insert(
-            {
-                "message_id": message_id,
-                "thread_id": thread_id,
-                "type": "user",
-                "is_llm_message": True,
-                "content": json.dumps(message_payload),
-                "created_at": datetime.now(timezone.utc).isoformat(),
-            }
-        ).execute()
-        # 6. Start the agent run
-        agent_run = (
-            await client.table("agent_runs")
-            .insert(
+        thread_agent_id = agent_config["agent_id"] if agent_config else None
+        if thread_agent_id:
+            logger.info(f"Storing agent_id {thread_agent_id} in thread")
+        try:
+            initiate_result = await client.rpc(
+                "initiate_agent",
                 {
-                    "thread_id": thread_id,
-                    "status": "running",
-                    "started_at": datetime.now(timezone.utc).isoformat(),
-                }
+                    "p_project_id": project_id,
+                    "p_account_id": account_id,
+                    "p_project_name": placeholder_name,
+                    "p_sandbox": {
+                        "id": sandbox_id,
+                        "pass": sandbox_pass,
+                        "vnc_preview": vnc_url,
+                        "sandbox_url": website_url,
+                        "token": token,
+                    },
+                    "p_message_content": orjson.dumps(message_payload).decode(),
+                    "p_created_at": now_iso,
+                    "p_thread_agent_id": thread_agent_id,
+                    "p_thread_metadata": thread_metadata,
+                },
+            ).execute()
+            if not initiate_result.data:
+                raise Exception("initiate_agent returned no data")
+        except Exception as e:
+            logger.error(
+                f"Failed to create records for project {project_id} with sandbox {sandbox_id}: {str(e)}"
             )
-            .execute()
+            try:
+                await delete_sandbox(sandbox_id)
+            except Exception as e:
+                logger.error(f"Error deleting sandbox: {str(e)}")
+            raise Exception("Database update failed")
+        thread_id = initiate_result.data["thread_id"]
+        agent_run_id = initiate_result.data["agent_run_id"]
+        logger.info(
+            f"Created project {project_id}, thread {thread_id} and agent run {agent_run_id}"
         )
-        agent_run_id = agent_run.data[0]["id"]
-        logger.info(f"Created new agent run: {agent_run_id}")
         # Register run in redis
         # Run agent in background
         return {"thread_id": thread_id, "agent_run_id": agent_run_id}
 
     except Exception as e:
         logger.error(f"Error in agent initiation: {str(e)}\n{traceback.format_exc()}")
-        # TODO: Clean up created project/thread if initiation fails mid-way
         raise HTTPException(
             status_code=500, detail=f"Failed to initiate agent session: {str(e)}"
         )
@@ -455,15 +462,18 @@ async def start_agent(
             status_code=500, detail="Agent API not initialized with instance ID"
         )
     model_name = body.model_name
-    logger.info(f"Original model_name from request: {model_name}")
-    if model_name is None:
-        model_name = config.MODEL_TO_USE
-        logger.info(f"Using model from config: {model_name}")
-    resolved_model = MODEL_NAME_ALIASES.get(model_name, model_name)
-    logger.info(f"Resolved model name: {resolved_model}")
-    model_name = resolved_model
+    logger.info("Original model_name from request: %s", model_name)
+    model_name = resolve_model_name(model_name)
+    logger.info("Resolved model name: %s", model_name)
     logger.info(
-        f"Starting new agent for thread: {thread_id} with config: model={model_name}, thinking={body.enable_thinking}, effort={body.reasoning_effort}, stream={body.stream}, context_manager={body.enable_context_manager} (Instance: {instance_id})"
+        "Starting new agent for thread: %s with config: model=%s, thinking=%s, effort=%s, stream=%s, context_manager=%s (Instance: %s)",
+        thread_id,
+        model_name,
+        body.enable_thinking,
+        body.reasoning_effort,
+        body.stream,
+        body.enable_context_manager,
+        instance_id,
     )
     client = await db.client
     await verify_thread_access(client, thread_id, user_id)
@@ -471,11 +481,12 @@ async def start_agent(
         await client.table("threads")
         .select("project_id", "account_id", "agent_id", "metadata")
         .eq("thread_id", thread_id)
+        .maybe_single()
         .execute()
     )
-    if not thread_result.data:
+    if not thread_result or not thread_result.data:
         raise HTTPException(status_code=404, detail="Thread not found")
-    thread_data = thread_result.data[0]
+    thread_data = thread_result.data
     project_id = thread_data.get("project_id")
     account_id = thread_data.get("account_id")
     thread_agent_id = thread_data.get("agent_id")
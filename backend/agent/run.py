@@ -1,6 +1,12 @@
+import asyncio
+import importlib
 import json
 import os
 import re
+import time
+from collections import OrderedDict, defaultdict
+from functools import lru_cache
+from hashlib import blake2b
 from typing import Any, Optional
 from uuid import uuid4
 
@@ -9,25 +15,113 @@ from dotenv import load_dotenv
 from agent.agent_builder_prompt import get_agent_builder_prompt
 from agent.gemini_prompt import get_gemini_system_prompt
 from agent.prompt import get_system_prompt
-from agent.tools.data_providers_tool import DataProvidersTool
 from agent.tools.expand_msg_tool import ExpandMessageTool
-from agent.tools.mcp_tool_wrapper import MCPToolWrapper
 from agent.tools.message_tool import MessageTool
-from agent.tools.sb_browser_tool import SandboxBrowserTool
-from agent.tools.sb_deploy_tool import SandboxDeployTool
-from agent.tools.sb_expose_tool import SandboxExposeTool
-from agent.tools.sb_files_tool import SandboxFilesTool
-from agent.tools.sb_shell_tool import SandboxShellTool
-from agent.tools.sb_vision_tool import SandboxVisionTool
-from agent.tools.web_search_tool import SandboxWebSearchTool
 from agentpress.response_processor import ProcessorConfig
 from agentpress.thread_manager import ThreadManager
 from agentpress.tool import SchemaType
 from services.langfuse import langfuse
+from services.supabase import DBConnection
 from utils.auth_utils import get_account_id_from_thread
 from utils.config import config
 from utils.logger import logger
 
+# agentpress_tools key -> (module, class, takes thread_id); imported only when enabled
+_SANDBOX_TOOLS = {
+    "sb_shell_tool": ("agent.tools.sb_shell_tool", "SandboxShellTool", False),
+    "sb_files_tool": ("agent.tools.sb_files_tool", "SandboxFilesTool", False),
+    "sb_browser_tool": ("agent.tools.sb_browser_tool", "SandboxBrowserTool", True),
+    "sb_deploy_tool": ("agent.tools.sb_deploy_tool", "SandboxDeployTool", False),
+    "sb_expose_tool": ("agent.tools.sb_expose_tool", "SandboxExposeTool", False),
+    "web_search_tool": ("agent.tools.web_search_tool", "SandboxWebSearchTool", False),
+    "sb_vision_tool": ("agent.tools.sb_vision_tool", "SandboxVisionTool", True),
+}
+
+
+# Initialized MCP wrappers keyed by a digest of their MCP configs, so server
+# handshakes are paid once per process instead of once per run
+MCP_WRAPPER_CACHE_SIZE = 32
+# Reconnect periodically so servers that changed their tools are picked up
+MCP_WRAPPER_CACHE_TTL = 1800
+_MCP_WRAPPER_CACHE: "OrderedDict[str, tuple]" = OrderedDict()
+# One lock per config digest: concurrent runs with the same MCPs share a single
+# initialization while unrelated configs initialize in parallel
+_MCP_WRAPPER_LOCKS: "defaultdict[str, asyncio.Lock]" = defaultdict(asyncio.Lock)
+
+
+@lru_cache(maxsize=None)
+def _load_tool(module_name: str, class_name: str) -> type:
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+def _materialize_custom_mcps(custom_mcps: list) -> list:
+    """Transform custom MCPs to the standard MCP config format."""
+    mcp_configs = []
+    for custom_mcp in custom_mcps:
+        mcp_type = custom_mcp["type"]
+        name = custom_mcp["name"]
+        mcp_configs.append(
+            {
+                "name": name,
+                "qualifiedName": f"custom_{mcp_type}_{name.replace(' ', '_').lower()}",
+                "config": custom_mcp["config"],
+                "enabledTools": custom_mcp.get("enabledTools", []),
+                "isCustom": True,
+                "customType": mcp_type,
+            }
+        )
+    return mcp_configs
+
+
+async def _get_mcp_wrapper(all_mcps: list) -> Any:
+    """Return an initialized MCPToolWrapper for this MCP config, reusing one per process."""
+    key = blake2b(
+        json.dumps(all_mcps, sort_keys=True).encode(), digest_size=16
+    ).hexdigest()
+    async with _MCP_WRAPPER_LOCKS[key]:
+        entry = _MCP_WRAPPER_CACHE.get(key)
+        if entry is not None:
+            expires_at, wrapper = entry
+            if expires_at > time.monotonic():
+                _MCP_WRAPPER_CACHE.move_to_end(key)
+                return wrapper
+            del _MCP_WRAPPER_CACHE[key]
+
+        MCPToolWrapper = _load_tool("agent.tools.mcp_tool_wrapper", "MCPToolWrapper")
+        wrapper = MCPToolWrapper(mcp_configs=all_mcps)
+        await wrapper.initialize_and_register_tools()
+        if not wrapper.all_servers_connected:
+            # Serve this run with what connected, but retry the rest next run
+            logger.warning("Not caching MCP wrapper: some servers failed to connect")
+            return wrapper
+        _MCP_WRAPPER_CACHE[key] = (time.monotonic() + MCP_WRAPPER_CACHE_TTL, wrapper)
+        if len(_MCP_WRAPPER_CACHE) > MCP_WRAPPER_CACHE_SIZE:
+            # Evicted wrappers may still be in use by a running agent, so they
+            # are dropped rather than disconnected
+            evicted_key, _ = _MCP_WRAPPER_CACHE.popitem(last=False)
+            _MCP_WRAPPER_LOCKS.pop(evicted_key, None)
+        return wrapper
+
+
+def _register_mcp_wrapper(thread_manager: ThreadManager, wrapper: Any) -> None:
+    """Register an already-initialized MCP wrapper's schemas in the run's tool registry."""
+    tool_registry = thread_manager.tool_registry
+    openapi, xml = SchemaType.OPENAPI, SchemaType.XML
+    for method_name, schema_list in wrapper.get_schemas().items():
+        for schema in schema_list:
+            schema_type = schema.schema_type
+            if schema_type is openapi:
+                tool_registry.tools[method_name] = {
+                    "instance": wrapper,
+                    "schema": schema,
+                }
+            elif schema_type is xml and schema.xml_schema:
+                tool_registry.xml_tools[schema.xml_schema.tag_name] = {
+                    "instance": wrapper,
+                    "method": method_name,
+                    "schema": schema,
+                }
+
 
 async def run_agent(
     thread_id: str,
@@ -57,20 +151,21 @@ async def run_agent(
     )
 
     client = await thread_manager.db.client
-    account_id = await get_account_id_from_thread(client, thread_id)
-    if not account_id:
-        raise ValueError("Could not determine account ID for thread")
-    project = (
-        await client.table("projects")
-        .select("*")
+    # The account lookup and the project fetch are independent round-trips
+    account_id, project = await asyncio.gather(
+        get_account_id_from_thread(client, thread_id),
+        client.table("projects")
+        .select("sandbox")
         .eq("project_id", project_id)
-        .execute()
+        .maybe_single()
+        .execute(),
     )
-    if not project.data or len(project.data) == 0:
+    if not account_id:
+        raise ValueError("Could not determine account ID for thread")
+    if not project or not project.data:
         raise ValueError(f"Project {project_id} not found")
 
-    project_data = project.data[0]
-    sandbox_info = project_data.get("sandbox", {})
+    sandbox_info = project.data.get("sandbox") or {}
     if not sandbox_info.get("id"):
         raise ValueError(f"No sandbox found for project {project_id}")
     enabled_tools = None
@@ -79,12 +174,9 @@ async def run_agent(
         logger.info(f"Using custom tool configuration from agent")
     if is_agent_builder:
         logger.info("Agent builder mode - registering only update agent tool")
-        from agent.tools.update_agent_tool import UpdateAgentTool
-        from services.supabase import DBConnection
-
         db = DBConnection()
         thread_manager.add_tool(
-            UpdateAgentTool,
+            _load_tool("agent.tools.update_agent_tool", "UpdateAgentTool"),
             thread_manager=thread_manager,
             db_connection=db,
             agent_id=target_agent_id,
@@ -94,86 +186,28 @@ async def run_agent(
         logger.info(
             "No agent specified - registering all tools for full Suna capabilities"
         )
-        thread_manager.add_tool(
-            SandboxShellTool, project_id=project_id, thread_manager=thread_manager
-        )
-        thread_manager.add_tool(
-            SandboxFilesTool, project_id=project_id, thread_manager=thread_manager
-        )
-        thread_manager.add_tool(
-            SandboxBrowserTool,
-            project_id=project_id,
-            thread_id=thread_id,
-            thread_manager=thread_manager,
-        )
-        thread_manager.add_tool(
-            SandboxDeployTool, project_id=project_id, thread_manager=thread_manager
-        )
-        thread_manager.add_tool(
-            SandboxExposeTool, project_id=project_id, thread_manager=thread_manager
-        )
-        thread_manager.add_tool(
-            ExpandMessageTool, thread_id=thread_id, thread_manager=thread_manager
-        )
-        thread_manager.add_tool(MessageTool)
-        thread_manager.add_tool(
-            SandboxWebSearchTool, project_id=project_id, thread_manager=thread_manager
-        )
-        thread_manager.add_tool(
-            SandboxVisionTool,
-            project_id=project_id,
-            thread_id=thread_id,
-            thread_manager=thread_manager,
-        )
-        if config.RAPID_API_KEY:
-            thread_manager.add_tool(DataProvidersTool)
     else:
         logger.info("Custom agent specified - registering only enabled tools")
-        thread_manager.add_tool(
-            ExpandMessageTool, thread_id=thread_id, thread_manager=thread_manager
-        )
-        thread_manager.add_tool(MessageTool)
-        if enabled_tools.get("sb_shell_tool", {}).get("enabled", False):
-            thread_manager.add_tool(
-                SandboxShellTool, project_id=project_id, thread_manager=thread_manager
-            )
-        if enabled_tools.get("sb_files_tool", {}).get("enabled", False):
-            thread_manager.add_tool(
-                SandboxFilesTool, project_id=project_id, thread_manager=thread_manager
-            )
-        if enabled_tools.get("sb_browser_tool", {}).get("enabled", False):
-            thread_manager.add_tool(
-                SandboxBrowserTool,
-                project_id=project_id,
-                thread_id=thread_id,
-                thread_manager=thread_manager,
-            )
-        if enabled_tools.get("sb_deploy_tool", {}).get("enabled", False):
-            thread_manager.add_tool(
-                SandboxDeployTool, project_id=project_id, thread_manager=thread_manager
-            )
-        if enabled_tools.get("sb_expose_tool", {}).get("enabled", False):
-            thread_manager.add_tool(
-                SandboxExposeTool, project_id=project_id, thread_manager=thread_manager
-            )
-        if enabled_tools.get("web_search_tool", {}).get("enabled", False):
-            thread_manager.add_tool(
-                SandboxWebSearchTool,
-                project_id=project_id,
-                thread_manager=thread_manager,
-            )
-        if enabled_tools.get("sb_vision_tool", {}).get("enabled", False):
-            thread_manager.add_tool(
-                SandboxVisionTool,
-                project_id=project_id,
-                thread_id=thread_id,
-                thread_manager=thread_manager,
-            )
-        if config.RAPID_API_KEY and enabled_tools.get("data_providers_tool", {}).get(
+    thread_manager.add_tool(
+        ExpandMessageTool, thread_id=thread_id, thread_manager=thread_manager
+    )
+    thread_manager.add_tool(MessageTool)
+    for tool_key, (module_name, class_name, needs_thread_id) in _SANDBOX_TOOLS.items():
+        if enabled_tools is not None and not enabled_tools.get(tool_key, {}).get(
             "enabled", False
         ):
-            thread_manager.add_tool(DataProvidersTool)
-    mcp_wrapper_instance = None
+            continue
+        tool_kwargs = {"project_id": project_id, "thread_manager": thread_manager}
+        if needs_thread_id:
+            tool_kwargs["thread_id"] = thread_id
+        thread_manager.add_tool(_load_tool(module_name, class_name), **tool_kwargs)
+    if config.RAPID_API_KEY and (
+        enabled_tools is None
+        or enabled_tools.get("data_providers_tool", {}).get("enabled", False)
+    ):
+        thread_manager.add_tool(
+            _load_tool("agent.tools.data_providers_tool", "DataProvidersTool")
+        )
     if agent_config:
         # Merge configured_mcps and custom_mcps
         all_mcps = []
@@ -184,51 +218,18 @@ async def run_agent(
 
         # Add custom MCPs
         if agent_config.get("custom_mcps"):
-            for custom_mcp in agent_config["custom_mcps"]:
-                # Transform custom MCP to standard format
-                mcp_config = {
-                    "name": custom_mcp["name"],
-                    "qualifiedName": f"custom_{custom_mcp['type']}_{custom_mcp['name'].replace(' ', '_').lower()}",
-                    "config": custom_mcp["config"],
-                    "enabledTools": custom_mcp.get("enabledTools", []),
-                    "isCustom": True,
-                    "customType": custom_mcp["type"],
-                }
-                all_mcps.append(mcp_config)
+            all_mcps.extend(_materialize_custom_mcps(agent_config["custom_mcps"]))
         if all_mcps:
             logger.info(
                 f"Registering MCP tool wrapper for {len(all_mcps)} MCP servers (including {len(agent_config.get('custom_mcps', []))} custom)"
             )
-            # Register the tool with all MCPs
-            thread_manager.add_tool(MCPToolWrapper, mcp_configs=all_mcps)
-
-            # Get the tool instance from the registry
-            # The tool is registered with method names as keys
-            for tool_name, tool_info in thread_manager.tool_registry.tools.items():
-                if isinstance(tool_info["instance"], MCPToolWrapper):
-                    mcp_wrapper_instance = tool_info["instance"]
-                    break
-            if mcp_wrapper_instance:
-                try:
-                    await mcp_wrapper_instance.initialize_and_register_tools()
-                    logger.info("MCP tools initialized successfully")
-
-                    # Re-register the updated schemas with the tool registry
-                    # This ensures the dynamically created tools are available for function calling
-                    updated_schemas = mcp_wrapper_instance.get_schemas()
-                    for method_name, schema_list in updated_schemas.items():
-                        if method_name != "call_mcp_tool":  # Skip the fallback method
-                            # Register each dynamic tool in the registry
-                            for schema in schema_list:
-                                if schema.schema_type == SchemaType.OPENAPI:
-                                    thread_manager.tool_registry.tools[method_name] = {
-                                        "instance": mcp_wrapper_instance,
-                                        "schema": schema,
-                                    }
-                                    logger.debug(
-                                        f"Registered dynamic MCP tool: {method_name}"
-                                    )
-
-                except Exception as e:
-                    logger.error(f"Failed to initialize MCP tools: {e}")
-                    # Continue without MCP tools if initialization fails
+            try:
+                wrapper = await _get_mcp_wrapper(all_mcps)
+                logger.info("MCP tools initialized successfully")
+
+                # Register the wrapper and its dynamically created tools so they
+                # are available for function calling in this run
+                _register_mcp_wrapper(thread_manager, wrapper)
+            except Exception as e:
+                logger.error(f"Failed to initialize MCP tools: {e}")
+                # Continue without MCP tools if initialization fails
@@ -70,7 +70,7 @@ class ExpandMessageTool(Tool):
             client = await self.thread_manager.db.client
             message = (
                 await client.table("messages")
-                .select("*")
+                .select("content")
                 .eq("message_id", message_id)
                 .eq("thread_id", self.thread_id)
                 .execute()
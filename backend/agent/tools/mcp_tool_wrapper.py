@@ -6,7 +6,6 @@ server tool calls through dynamically generated individual function methods.
 """
 
 import asyncio
-import inspect
 import json
 from typing import Any, Dict, List, Optional
 
@@ -21,6 +20,10 @@ from agentpress.tool import (SchemaType, Tool, ToolResult, ToolSchema,
 from utils.logger import logger
 
 
+def _server_key(config: Dict[str, Any]) -> str:
+    return config.get("qualifiedName") or config.get("name", "Unknown")
+
+
 class MCPToolWrapper(Tool):
     """
     A generic tool wrapper that dynamically creates individual methods for each MCP tool.
@@ -43,10 +46,16 @@ class MCPToolWrapper(Tool):
         self._dynamic_tools = {}
         self._schemas: Dict[str, List[ToolSchema]] = {}
         self._custom_tools = {}  # Store custom MCP tools separately
+        self._connected_servers = set()  # qualifiedNames that connected
 
         # Now initialize the parent class which will call _register_schemas
         super().__init__()
 
+    @property
+    def all_servers_connected(self) -> bool:
+        """Whether every configured MCP server connected during initialization."""
+        return all(_server_key(cfg) in self._connected_servers for cfg in self.mcp_configs)
+
     async def _ensure_initialized(self):
         """Ensure MCP servers are initialized."""
         if not self._initialized:
@@ -58,24 +67,26 @@ class MCPToolWrapper(Tool):
                 cfg for cfg in self.mcp_configs if cfg.get("isCustom", False)
             ]
 
-            # Initialize standard MCPs through MCPManager
-            if standard_configs:
-                for config in standard_configs:
-                    try:
-                        await self.mcp_manager.connect_server(config)
-                    except Exception as e:
-                        logger.error(
-                            f"Failed to connect to MCP server {config['qualifiedName']}: {e}"
-                        )
-
-            # Initialize custom MCPs directly
-            if custom_configs:
-                await self._initialize_custom_mcps(custom_configs)
+            # Standard MCPs go through MCPManager, custom MCPs are connected directly;
+            # every server handshake runs concurrently
+            await asyncio.gather(
+                *(self._connect_standard_server(config) for config in standard_configs),
+                self._initialize_custom_mcps(custom_configs),
+            )
 
             # Create dynamic tools for all connected servers
             await self._create_dynamic_tools()
             self._initialized = True
 
+    async def _connect_standard_server(self, config):
+        try:
+            await self.mcp_manager.connect_server(config)
+            self._connected_servers.add(_server_key(config))
+        except Exception as e:
+            logger.error(
+                f"Failed to connect to MCP server {config['qualifiedName']}: {e}"
+            )
+
     async def _connect_sse_server(self, server_name, server_config, all_tools, timeout):
         url = server_config["url"]
         headers = server_config.get("headers", {})
@@ -189,91 +200,47 @@ class MCPToolWrapper(Tool):
                     )
 
     async def _initialize_custom_mcps(self, custom_configs):
-        """Initialize custom MCP servers."""
-        for config in custom_configs:
-            try:
-                logger.info(f"Initializing custom MCP: {config}")
-                custom_type = config.get("customType", "sse")
-                server_config = config.get("config", {})
-                enabled_tools = config.get("enabledTools", [])
-                server_name = config.get("name", "Unknown")
-
-                logger.info(
-                    f"Initializing custom MCP: {server_name} (type: {custom_type})"
-                )
-
-                if custom_type == "sse":
-                    if "url" not in server_config:
-                        logger.error(
-                            f"Custom MCP {server_name}: Missing 'url' in config"
-                        )
-                        continue
-
-                    url = server_config["url"]
-                    logger.info(f"Initializing custom MCP {url} with SSE type")
-
-                    try:
-                        # Use the working connect_sse_server method
-                        all_tools = {}
-                        await self._connect_sse_server(
-                            server_name, server_config, all_tools, 15
-                        )
-
-                        # Process the results
-                        if (
-                            server_name in all_tools
-                            and all_tools[server_name].get("status") == "connected"
-                        ):
-                            tools_info = all_tools[server_name].get("tools", [])
-                            tools_registered = 0
-
-                            for tool_info in tools_info:
-                                tool_name_from_server = tool_info["name"]
-                                if (
-                                    not enabled_tools
-                                    or tool_name_from_server in enabled_tools
-                                ):
-                                    tool_name = f"custom_{server_name.replace(' ', '_').lower()}_{tool_name_from_server}"
-                                    self._custom_tools[tool_name] = {
-                                        "name": tool_name,
-                                        "description": tool_info["description"],
-                                        "parameters": tool_info["input_schema"],
-                                        "server": server_name,
-                                        "original_name": tool_name_from_server,
-                                        "is_custom": True,
-                                        "custom_type": custom_type,
-                                        "custom_config": server_config,
-                                    }
-                                    tools_registered += 1
-                                    logger.debug(f"Registered custom tool: {tool_name}")
+        """Initialize custom MCP servers concurrently."""
+        await asyncio.gather(
+            *(self._initialize_custom_mcp(config) for config in custom_configs)
+        )
 
-                            logger.info(
-                                f"Successfully initialized custom MCP {server_name} with {tools_registered} tools"
-                            )
-                        else:
-                            logger.error(
-                                f"Failed to connect to custom MCP {server_name}"
-                            )
+    async def _initialize_custom_mcp(self, config):
+        """Initialize a single custom MCP server."""
+        try:
+            logger.info(f"Initializing custom MCP: {config}")
+            custom_type = config.get("customType", "sse")
+            server_config = config.get("config", {})
+            enabled_tools = config.get("enabledTools", [])
+            server_name = config.get("name", "Unknown")
 
-                    except Exception as e:
-                        logger.error(
-                            f"Custom MCP {server_name}: Connection failed - {str(e)}"
-                        )
-                        continue
+            logger.info(
+                f"Initializing custom MCP: {server_name} (type: {custom_type})"
+            )
 
-                elif custom_type == "http":
-                    if "url" not in server_config:
-                        logger.error(
-                            f"Custom MCP {server_name}: Missing 'url' in config"
-                        )
-                        continue
+            if custom_type == "sse":
+                if "url" not in server_config:
+                    logger.error(
+                        f"Custom MCP {server_name}: Missing 'url' in config"
+                    )
+                    return
 
-                    url = server_config["url"]
-                    logger.info(f"Initializing custom MCP {url} with HTTP type")
+                url = server_config["url"]
+                logger.info(f"Initializing custom MCP {url} with SSE type")
 
-                    try:
+                try:
+                    # Use the working connect_sse_server method
+                    all_tools = {}
+                    await self._connect_sse_server(
+                        server_name, server_config, all_tools, 15
+                    )
 
-                        tools_info = await self._connect_streamable_http_server(url)
+                    # Process the results
+                    if (
+                        server_name in all_tools
+                        and all_tools[server_name].get("status") == "connected"
+                    ):
+                        tools_info = all_tools[server_name].get("tools", [])
                         tools_registered = 0
 
                         for tool_info in tools_info:
@@ -286,7 +253,7 @@ class MCPToolWrapper(Tool):
                                 self._custom_tools[tool_name] = {
                                     "name": tool_name,
                                     "description": tool_info["description"],
-                                    "parameters": tool_info["inputSchema"],
+                                    "parameters": tool_info["input_schema"],
                                     "server": server_name,
                                     "original_name": tool_name_from_server,
                                     "is_custom": True,
@@ -296,87 +263,139 @@ class MCPToolWrapper(Tool):
                                 tools_registered += 1
                                 logger.debug(f"Registered custom tool: {tool_name}")
 
+                        self._connected_servers.add(_server_key(config))
                         logger.info(
                             f"Successfully initialized custom MCP {server_name} with {tools_registered} tools"
                         )
-
-                    except Exception as e:
+                    else:
                         logger.error(
-                            f"Custom MCP {server_name}: Connection failed - {str(e)}"
+                            f"Failed to connect to custom MCP {server_name}"
                         )
-                        continue
 
-                elif custom_type == "json":
-                    if "command" not in server_config:
-                        logger.error(
-                            f"Custom MCP {server_name}: Missing 'command' in config"
-                        )
-                        continue
+                except Exception as e:
+                    logger.error(
+                        f"Custom MCP {server_name}: Connection failed - {str(e)}"
+                    )
+                    return
 
-                    logger.info(
-                        f"Initializing custom MCP {server_name} with JSON/stdio type"
+            elif custom_type == "http":
+                if "url" not in server_config:
+                    logger.error(
+                        f"Custom MCP {server_name}: Missing 'url' in config"
                     )
+                    return
 
-                    try:
-                        # Use the stdio connection method
-                        all_tools = {}
-                        await self._connect_stdio_server(
-                            server_name, server_config, all_tools, 15
-                        )
+                url = server_config["url"]
+                logger.info(f"Initializing custom MCP {url} with HTTP type")
 
-                        # Process the results
+                try:
+
+                    tools_info = await self._connect_streamable_http_server(url)
+                    tools_registered = 0
+
+                    for tool_info in tools_info:
+                        tool_name_from_server = tool_info["name"]
                         if (
-                            server_name in all_tools
-                            and all_tools[server_name].get("status") == "connected"
+                            not enabled_tools
+                            or tool_name_from_server in enabled_tools
                         ):
-                            tools_info = all_tools[server_name].get("tools", [])
-                            tools_registered = 0
-
-                            for tool_info in tools_info:
-                                tool_name_from_server = tool_info["name"]
-                                if (
-                                    not enabled_tools
-                                    or tool_name_from_server in enabled_tools
-                                ):
-                                    tool_name = f"custom_{server_name.replace(' ', '_').lower()}_{tool_name_from_server}"
-                                    self._custom_tools[tool_name] = {
-                                        "name": tool_name,
-                                        "description": tool_info["description"],
-                                        "parameters": tool_info["input_schema"],
-                                        "server": server_name,
-                                        "original_name": tool_name_from_server,
-                                        "is_custom": True,
-                                        "custom_type": custom_type,
-                                        "custom_config": server_config,
-                                    }
-                                    tools_registered += 1
-                                    logger.debug(f"Registered custom tool: {tool_name}")
+                            tool_name = f"custom_{server_name.replace(' ', '_').lower()}_{tool_name_from_server}"
+                            self._custom_tools[tool_name] = {
+                                "name": tool_name,
+                                "description": tool_info["description"],
+                                "parameters": tool_info["inputSchema"],
+                                "server": server_name,
+                                "original_name": tool_name_from_server,
+                                "is_custom": True,
+                                "custom_type": custom_type,
+                                "custom_config": server_config,
+                            }
+                            tools_registered += 1
+                            logger.debug(f"Registered custom tool: {tool_name}")
 
-                            logger.info(
-                                f"Successfully initialized custom MCP {server_name} with {tools_registered} tools"
-                            )
-                        else:
-                            logger.error(
-                                f"Failed to connect to custom MCP {server_name}"
-                            )
+                    self._connected_servers.add(_server_key(config))
+                    logger.info(
+                        f"Successfully initialized custom MCP {server_name} with {tools_registered} tools"
+                    )
 
-                    except Exception as e:
+                except Exception as e:
+                    logger.error(
+                        f"Custom MCP {server_name}: Connection failed - {str(e)}"
+                    )
+                    return
+
+            elif custom_type == "json":
+                if "command" not in server_config:
+                    logger.error(
+                        f"Custom MCP {server_name}: Missing 'command' in config"
+                    )
+                    return
+
+                logger.info(
+                    f"Initializing custom MCP {server_name} with JSON/stdio type"
+                )
+
+                try:
+                    # Use the stdio connection method
+                    all_tools = {}
+                    await self._connect_stdio_server(
+                        server_name, server_config, all_tools, 15
+                    )
+
+                    # Process the results
+                    if (
+                        server_name in all_tools
+                        and all_tools[server_name].get("status") == "connected"
+                    ):
+                        tools_info = all_tools[server_name].get("tools", [])
+                        tools_registered = 0
+
+                        for tool_info in tools_info:
+                            tool_name_from_server = tool_info["name"]
+                            if (
+                                not enabled_tools
+                                or tool_name_from_server in enabled_tools
+                            ):
+                                tool_name = f"custom_{server_name.replace(' ', '_').lower()}_{tool_name_from_server}"
+                                self._custom_tools[tool_name] = {
+                                    "name": tool_name,
+                                    "description": tool_info["description"],
+                                    "parameters": tool_info["input_schema"],
+                                    "server": server_name,
+                                    "original_name": tool_name_from_server,
+                                    "is_custom": True,
+                                    "custom_type": custom_type,
+                                    "custom_config": server_config,
+                                }
+                                tools_registered += 1
+                                logger.debug(f"Registered custom tool: {tool_name}")
+
+                        self._connected_servers.add(_server_key(config))
+                        logger.info(
+                            f"Successfully initialized custom MCP {server_name} with {tools_registered} tools"
+                        )
+                    else:
                         logger.error(
-                            f"Custom MCP {server_name}: Connection failed - {str(e)}"
+                            f"Failed to connect to custom MCP {server_name}"
                         )
-                        continue
 
-                else:
+                except Exception as e:
                     logger.error(
-                        f"Custom MCP {server_name}: Unsupported type '{custom_type}', supported types are 'sse', 'http' and 'json'"
+                        f"Custom MCP {server_name}: Connection failed - {str(e)}"
                     )
-                    continue
+                    return
 
-            except Exception as e:
+            else:
                 logger.error(
-                    f"Failed to initialize custom MCP {config.get('name', 'Unknown')}: {e}"
+                    f"Custom MCP {server_name}: Unsupported type '{custom_type}', supported types are 'sse', 'http' and 'json'"
                 )
-                continue
+                return
+
+        except Exception as e:
+            logger.error(
+                f"Failed to initialize custom MCP {config.get('name', 'Unknown')}: {e}"
+            )
+            return
 
     async def initialize_and_register_tools(self, tool_registry=None):
         """Initialize MCP tools and optionally update the tool registry.
@@ -501,12 +520,7 @@ class MCPToolWrapper(Tool):
     def _register_schemas(self):
         """Register schemas from all decorated methods and dynamic tools."""
         # First register static schemas from decorated methods
-        for name, method in inspect.getmembers(self, predicate=inspect.ismethod):
-            if hasattr(method, "tool_schemas"):
-                self._schemas[name] = method.tool_schemas
-                logger.debug(
-                    f"Registered schemas for method '{name}' in {self.__class__.__name__}"
-                )
+        self._schemas.update(self._class_schemas())
 
         # Note: Dynamic schemas will be added after async initialization
         logger.debug(f"Initial registration complete for MCPToolWrapper")
@@ -45,7 +45,7 @@ class SandboxFilesTool(SandboxToolsBase):
                 rel_path = file_info.name
 
                 # Skip excluded files and directories
-                if self._should_exclude_file(rel_path) or file_info.is_dir:
+                if file_info.is_dir or self._should_exclude_file(rel_path):
                     continue
 
                 try:
@@ -4,6 +4,7 @@ from uuid import uuid4
 
 from agentpress.thread_manager import ThreadManager
 from agentpress.tool import ToolResult, openapi_schema, xml_schema
+from sandbox.sandbox import SessionExecuteRequest
 from sandbox.tool_base import SandboxToolsBase
 
 
@@ -260,8 +261,6 @@ class SandboxShellTool(SandboxToolsBase):
         session_id = await self._ensure_session("raw_commands")
 
         # Execute command in session
-        from sandbox.sandbox import SessionExecuteRequest
-
         req = SessionExecuteRequest(
             command=command, var_async=False, cwd=self.workspace_path
         )
@@ -1,15 +1,27 @@
-import base64
+import asyncio
 import json
 import mimetypes
 import os
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from hashlib import blake2b
 from io import BytesIO
 from typing import Optional, Tuple
 
+import pybase64
 from PIL import Image
 
+try:
+    # libvips streams tiles and uses SIMD resize/encode kernels; prefer it for
+    # non-animated images when it is installed.
+    import pyvips
+except ImportError:  # pragma: no cover - optional dependency
+    pyvips = None
+
 from agentpress.thread_manager import ThreadManager
 from agentpress.tool import ToolResult, openapi_schema, xml_schema
 from sandbox.tool_base import SandboxToolsBase
+from utils.config import config
 
 # Add common image MIME types if mimetypes module is limited
 mimetypes.add_type("image/webp", ".webp")
@@ -27,95 +39,210 @@ DEFAULT_MAX_WIDTH = 1920
 DEFAULT_MAX_HEIGHT = 1080
 DEFAULT_JPEG_QUALITY = 85
 DEFAULT_PNG_COMPRESS_LEVEL = 6
+# Images below this size that already fit the max dimensions are sent as-is
+COMPRESS_SKIP_THRESHOLD = 256 * 1024
+COMPRESS_SKIP_MIME_TYPES = ("image/jpeg", "image/png", "image/webp")
+
+
+# Process pool for CPU-bound image compression, created on first use so that
+# forked workers don't inherit an already-running pool.
+_IMG_POOL: Optional[ProcessPoolExecutor] = None
+
+
+def _get_image_pool() -> ProcessPoolExecutor:
+    global _IMG_POOL
+    if _IMG_POOL is None:
+        # Every API worker has its own pool; share the cores between them
+        _IMG_POOL = ProcessPoolExecutor(
+            max_workers=max(1, (os.cpu_count() or 1) // config.WEB_CONCURRENCY)
+        )
+    return _IMG_POOL
+
+
+# LRU of (content hash, input mime type, settings) ->
+# (base64, mime_type, compressed_size), bounded by entry count and total
+# base64 bytes held
+IMAGE_CACHE_MAX_ENTRIES = 64
+IMAGE_CACHE_MAX_BYTES = 100 * 1024 * 1024
+_image_cache: "OrderedDict[tuple, Tuple[str, str, int]]" = OrderedDict()
+_image_cache_bytes = 0
+
+
+def _image_cache_key(image_bytes: bytes, mime_type: str) -> tuple:
+    # The output format depends on the input mime type, not just the bytes
+    return (
+        blake2b(image_bytes, digest_size=16).digest(),
+        mime_type,
+        DEFAULT_MAX_WIDTH,
+        DEFAULT_MAX_HEIGHT,
+        DEFAULT_JPEG_QUALITY,
+    )
 
 
-class SandboxVisionTool(SandboxToolsBase):
-    """Tool for allowing the agent to 'see' images within the sandbox."""
+def _image_cache_get(key: tuple) -> Optional[Tuple[str, str, int]]:
+    entry = _image_cache.get(key)
+    if entry is not None:
+        _image_cache.move_to_end(key)
+    return entry
 
-    def __init__(self, project_id: str, thread_id: str, thread_manager: ThreadManager):
-        super().__init__(project_id, thread_manager)
-        self.thread_id = thread_id
-        # Make thread_manager accessible within the tool instance
-        self.thread_manager = thread_manager
 
-    def compress_image(
-        self, image_bytes: bytes, mime_type: str, file_path: str
-    ) -> Tuple[bytes, str]:
-        """Compress an image to reduce its size while maintaining reasonable quality.
+def _image_cache_put(key: tuple, entry: Tuple[str, str, int]) -> None:
+    global _image_cache_bytes
+    if key in _image_cache:
+        return
+    _image_cache[key] = entry
+    _image_cache_bytes += len(entry[0])
+    while _image_cache and (
+        len(_image_cache) > IMAGE_CACHE_MAX_ENTRIES
+        or _image_cache_bytes > IMAGE_CACHE_MAX_BYTES
+    ):
+        _, evicted = _image_cache.popitem(last=False)
+        _image_cache_bytes -= len(evicted[0])
 
-        Args:
-            image_bytes: Original image bytes
-            mime_type: MIME type of the image
-            file_path: Path to the image file (for logging)
 
-        Returns:
-            Tuple of (compressed_bytes, new_mime_type)
-        """
-        try:
-            # Open image from bytes
-            img = Image.open(BytesIO(image_bytes))
+def _compress_with_vips(image_bytes: bytes, mime_type: str) -> Tuple[bytes, str]:
+    """Resize and encode an image with libvips, mirroring the Pillow pipeline."""
+    img = pyvips.Image.thumbnail_buffer(
+        image_bytes, DEFAULT_MAX_WIDTH, height=DEFAULT_MAX_HEIGHT, size="down"
+    )
+    if mime_type == "image/png":
+        return (
+            img.pngsave_buffer(compression=DEFAULT_PNG_COMPRESS_LEVEL, strip=True),
+            "image/png",
+        )
+    if img.hasalpha():
+        img = img.flatten(background=[255, 255, 255])
+    return (
+        img.jpegsave_buffer(Q=DEFAULT_JPEG_QUALITY, optimize_coding=True, strip=True),
+        "image/jpeg",
+    )
 
-            # Convert RGBA to RGB if necessary (for JPEG)
-            if img.mode in ("RGBA", "LA", "P"):
-                # Create a white background
+
+def _compress_image_worker(
+    image_bytes: bytes, mime_type: str, file_path: str, white_matte: bool = True
+) -> Tuple[bytes, str]:
+    """Compress an image to reduce its size while maintaining reasonable quality.
+
+    Args:
+        image_bytes: Original image bytes
+        mime_type: MIME type of the image
+        file_path: Path to the image file (for logging)
+        white_matte: Composite translucent images onto white instead of
+            simply dropping the alpha channel
+
+    Returns:
+        Tuple of (compressed_bytes, new_mime_type)
+    """
+    if (
+        len(image_bytes) < COMPRESS_SKIP_THRESHOLD
+        and mime_type in COMPRESS_SKIP_MIME_TYPES
+    ):
+        try:
+            # Only the header is parsed here; pixel data is never decoded
+            with Image.open(BytesIO(image_bytes)) as probe:
+                width, height = probe.size
+            if width <= DEFAULT_MAX_WIDTH and height <= DEFAULT_MAX_HEIGHT:
+                return image_bytes, mime_type
+        except Exception:
+            pass
+
+    if pyvips is not None and mime_type != "image/gif":
+        try:
+            compressed_bytes, output_mime = _compress_with_vips(image_bytes, mime_type)
+            print(
+                f"[SeeImage] Compressed '{file_path}' with libvips from {len(image_bytes) / 1024:.1f}KB to {len(compressed_bytes) / 1024:.1f}KB"
+            )
+            return compressed_bytes, output_mime
+        except Exception as e:
+            print(f"[SeeImage] libvips compression failed: {str(e)}. Falling back to Pillow.")
+
+    try:
+        # Open image from bytes
+        img = Image.open(BytesIO(image_bytes))
+        # Let libjpeg downscale by a power of two while decoding, so a large
+        # JPEG is never fully materialized at its original resolution
+        img.draft(img.mode, (DEFAULT_MAX_WIDTH, DEFAULT_MAX_HEIGHT))
+
+        # Convert RGBA to RGB if necessary (for JPEG)
+        if img.mode == "P":
+            img = img.convert("RGBA" if "transparency" in img.info else "RGB")
+        if img.mode in ("RGBA", "LA"):
+            alpha = img.getchannel("A")
+            if not white_matte or alpha.getextrema() == (255, 255):
+                # Fully opaque (or no matting wanted): drop alpha in one pass
+                img = img.convert("RGB")
+            else:
+                # Composite onto a white background
                 background = Image.new("RGB", img.size, (255, 255, 255))
-                if img.mode == "P":
-                    img = img.convert("RGBA")
-                background.paste(
-                    img, mask=img.split()[-1] if img.mode == "RGBA" else None
-                )
+                background.paste(img, mask=alpha)
                 img = background
 
-            # Calculate new dimensions while maintaining aspect ratio
-            width, height = img.size
-            if width > DEFAULT_MAX_WIDTH or height > DEFAULT_MAX_HEIGHT:
-                ratio = min(DEFAULT_MAX_WIDTH / width, DEFAULT_MAX_HEIGHT / height)
-                new_width = int(width * ratio)
-                new_height = int(height * ratio)
-                img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
-                print(
-                    f"[SeeImage] Resized image from {width}x{height} to {new_width}x{new_height}"
-                )
+        # Calculate new dimensions while maintaining aspect ratio
+        width, height = img.size
+        if width > DEFAULT_MAX_WIDTH or height > DEFAULT_MAX_HEIGHT:
+            ratio = min(DEFAULT_MAX_WIDTH / width, DEFAULT_MAX_HEIGHT / height)
+            new_width = int(width * ratio)
+            new_height = int(height * ratio)
+            img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
+            print(
+                f"[SeeImage] Resized image from {width}x{height} to {new_width}x{new_height}"
+            )
 
-            # Save to bytes with compression
-            output = BytesIO()
-
-            # Determine output format based on original mime type
-            if mime_type == "image/gif":
-                # Keep GIFs as GIFs to preserve animation
-                img.save(output, format="GIF", optimize=True)
-                output_mime = "image/gif"
-            elif mime_type == "image/png":
-                # Compress PNG
-                img.save(
-                    output,
-                    format="PNG",
-                    optimize=True,
-                    compress_level=DEFAULT_PNG_COMPRESS_LEVEL,
-                )
-                output_mime = "image/png"
-            else:
-                # Convert everything else to JPEG for better compression
-                img.save(
-                    output, format="JPEG", quality=DEFAULT_JPEG_QUALITY, optimize=True
-                )
-                output_mime = "image/jpeg"
+        # Save to bytes with compression
+        output = BytesIO()
+
+        # Determine output format based on original mime type
+        if mime_type == "image/gif":
+            # Keep GIFs as GIFs to preserve animation
+            img.save(output, format="GIF", optimize=True)
+            output_mime = "image/gif"
+        elif mime_type == "image/png":
+            # Compress PNG
+            img.save(
+                output,
+                format="PNG",
+                optimize=True,
+                compress_level=DEFAULT_PNG_COMPRESS_LEVEL,
+            )
+            output_mime = "image/png"
+        else:
+            # Convert everything else to JPEG for better compression
+            img.save(
+                output, format="JPEG", quality=DEFAULT_JPEG_QUALITY, optimize=True
+            )
+            output_mime = "image/jpeg"
 
-            compressed_bytes = output.getvalue()
+        compressed_bytes = output.getvalue()
 
-            # Log compression results
-            original_size = len(image_bytes)
-            compressed_size = len(compressed_bytes)
-            compression_ratio = (1 - compressed_size / original_size) * 100
-            print(
-                f"[SeeImage] Compressed '{file_path}' from {original_size / 1024:.1f}KB to {compressed_size / 1024:.1f}KB ({compression_ratio:.1f}% reduction)"
-            )
+        # Log compression results
+        original_size = len(image_bytes)
+        compressed_size = len(compressed_bytes)
+        compression_ratio = (1 - compressed_size / original_size) * 100
+        print(
+            f"[SeeImage] Compressed '{file_path}' from {original_size / 1024:.1f}KB to {compressed_size / 1024:.1f}KB ({compression_ratio:.1f}% reduction)"
+        )
 
-            return compressed_bytes, output_mime
+        return compressed_bytes, output_mime
+
+    except Exception as e:
+        print(f"[SeeImage] Failed to compress image: {str(e)}. Using original.")
+        return image_bytes, mime_type
 
-        except Exception as e:
-            print(f"[SeeImage] Failed to compress image: {str(e)}. Using original.")
-            return image_bytes, mime_type
+
+class SandboxVisionTool(SandboxToolsBase):
+    """Tool for allowing the agent to 'see' images within the sandbox."""
+
+    def __init__(self, project_id: str, thread_id: str, thread_manager: ThreadManager):
+        super().__init__(project_id, thread_manager)
+        self.thread_id = thread_id
+        # Make thread_manager accessible within the tool instance
+        self.thread_manager = thread_manager
+
+    def compress_image(
+        self, image_bytes: bytes, mime_type: str, file_path: str
+    ) -> Tuple[bytes, str]:
+        """Compress an image synchronously. See `_compress_image_worker`."""
+        return _compress_image_worker(image_bytes, mime_type, file_path)
 
     @openapi_schema(
         {
@@ -200,19 +327,39 @@ class SandboxVisionTool(SandboxToolsBase):
                         f"Unsupported or unknown image format for file: '{cleaned_path}'. Supported: JPG, PNG, GIF, WEBP."
                     )
 
-            # Compress the image
-            compressed_bytes, compressed_mime_type = self.compress_image(
-                image_bytes, mime_type, cleaned_path
-            )
-
-            # Check if compressed image is still too large
-            if len(compressed_bytes) > MAX_COMPRESSED_SIZE:
-                return self.fail_response(
-                    f"Image file '{cleaned_path}' is still too large after compression ({len(compressed_bytes) / (1024*1024):.2f}MB). Maximum compressed size is {MAX_COMPRESSED_SIZE / (1024*1024)}MB."
+            cache_key = _image_cache_key(image_bytes, mime_type)
+            cached = _image_cache_get(cache_key)
+            if cached is not None:
+                base64_image, compressed_mime_type, compressed_size = cached
+            else:
+                # Compress the image in a worker process to keep the event loop free
+                (
+                    compressed_bytes,
+                    compressed_mime_type,
+                ) = await asyncio.get_running_loop().run_in_executor(
+                    _get_image_pool(),
+                    _compress_image_worker,
+                    image_bytes,
+                    mime_type,
+                    cleaned_path,
                 )
+                compressed_size = len(compressed_bytes)
+                # The original download is no longer needed; drop it before
+                # allocating the base64 copy to keep peak memory down
+                del image_bytes
 
-            # Convert to base64
-            base64_image = base64.b64encode(compressed_bytes).decode("utf-8")
+                # Check if compressed image is still too large
+                if compressed_size > MAX_COMPRESSED_SIZE:
+                    return self.fail_response(
+                        f"Image file '{cleaned_path}' is still too large after compression ({compressed_size / (1024*1024):.2f}MB). Maximum compressed size is {MAX_COMPRESSED_SIZE / (1024*1024)}MB."
+                    )
+
+                # Convert to base64 (SIMD encoder, returns str without a decode copy)
+                base64_image = pybase64.b64encode_as_string(compressed_bytes)
+                del compressed_bytes
+                _image_cache_put(
+                    cache_key, (base64_image, compressed_mime_type, compressed_size)
+                )
 
             # Prepare the temporary message content
             image_context_data = {
@@ -220,7 +367,7 @@ class SandboxVisionTool(SandboxToolsBase):
                 "base64": base64_image,
                 "file_path": cleaned_path,  # Include path for context
                 "original_size": file_info.size,
-                "compressed_size": len(compressed_bytes),
+                "compressed_size": compressed_size,
             }
 
             # Add the temporary message using the thread_manager callback
@@ -234,7 +381,7 @@ class SandboxVisionTool(SandboxToolsBase):
 
             # Inform the agent the image will be available next turn
             return self.success_response(
-                f"Successfully loaded and compressed the image '{cleaned_path}' (reduced from {file_info.size / 1024:.1f}KB to {len(compressed_bytes) / 1024:.1f}KB)."
+                f"Successfully loaded and compressed the image '{cleaned_path}' (reduced from {file_info.size / 1024:.1f}KB to {compressed_size / 1024:.1f}KB)."
             )
 
         except Exception as e:
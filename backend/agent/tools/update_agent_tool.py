@@ -1,7 +1,11 @@
+import base64
 import json
+import os
 from typing import Any, Dict, List, Optional
+from urllib.parse import quote
 
 import httpx
+import orjson
 
 from agentpress.thread_manager import ThreadManager
 from agentpress.tool import Tool, ToolResult, openapi_schema, xml_schema
@@ -21,8 +25,6 @@ class UpdateAgentTool(Tool):
         self.agent_id = agent_id
         # Smithery API configuration
         self.smithery_api_base_url = "https://registry.smithery.ai"
-        import os
-
         self.smithery_api_key = os.getenv("SMITHERY_API_KEY")
 
     @openapi_schema(
@@ -428,12 +430,12 @@ class UpdateAgentTool(Tool):
 
                 if not formatted_servers:
                     return ToolResult(
-                        success=False, output=json.dumps([], ensure_ascii=False)
+                        success=False, output="[]"
                     )
 
                 return ToolResult(
                     success=True,
-                    output=json.dumps(formatted_servers, ensure_ascii=False),
+                    output=orjson.dumps(formatted_servers).decode(),
                 )
 
         except Exception as e:
@@ -497,8 +499,6 @@ class UpdateAgentTool(Tool):
                     headers["Authorization"] = f"Bearer {self.smithery_api_key}"
 
                 # URL encode the qualified name if it contains special characters
-                from urllib.parse import quote
-
                 if "@" in qualified_name or "/" in qualified_name:
                     encoded_name = quote(qualified_name, safe="")
                 else:
@@ -514,9 +514,6 @@ class UpdateAgentTool(Tool):
             # Now connect to the MCP server to get actual tools using ClientSession
             try:
                 # Import MCP components
-                import base64
-                import os
-
                 from mcp import ClientSession
                 from mcp.client.streamable_http import streamablehttp_client
 
@@ -1105,9 +1102,6 @@ class UpdateAgentTool(Tool):
         """
         try:
             # Import MCP components
-            import base64
-            import os
-
             from mcp import ClientSession
             from mcp.client.streamable_http import streamablehttp_client
 
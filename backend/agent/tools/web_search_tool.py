@@ -1,10 +1,11 @@
 import asyncio
 import datetime
-import json
 import logging
 import os
+from urllib.parse import urlparse
 
 import httpx
+import orjson
 from dotenv import load_dotenv
 from tavily import AsyncTavilyClient
 
@@ -130,7 +131,7 @@ class SandboxWebSearchTool(SandboxToolsBase):
             # Consider search successful if we have either results OR an answer
             if len(results) > 0 or (answer and answer.strip()):
                 return ToolResult(
-                    success=True, output=json.dumps(search_response, ensure_ascii=False)
+                    success=True, output=orjson.dumps(search_response).decode()
                 )
             else:
                 # No results or answer found
@@ -139,7 +140,7 @@ class SandboxWebSearchTool(SandboxToolsBase):
                 )
                 return ToolResult(
                     success=False,
-                    output=json.dumps(search_response, ensure_ascii=False),
+                    output=orjson.dumps(search_response).decode(),
                 )
 
         except Exception as e:
@@ -352,8 +353,6 @@ class SandboxWebSearchTool(SandboxToolsBase):
             timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
 
             # Extract domain from URL for the filename
-            from urllib.parse import urlparse
-
             parsed_url = urlparse(url)
             domain = parsed_url.netloc.replace("www.", "")
 
@@ -368,12 +367,12 @@ class SandboxWebSearchTool(SandboxToolsBase):
             self.sandbox.fs.create_folder(scrape_dir, "755")
 
             results_file_path = f"{scrape_dir}/{safe_filename}"
-            json_content = json.dumps(formatted_result, ensure_ascii=False, indent=2)
+            json_content = orjson.dumps(formatted_result, option=orjson.OPT_INDENT_2)
             logging.info(
                 f"Saving content to file: {results_file_path}, size: {len(json_content)} bytes"
             )
 
-            self.sandbox.fs.upload_file(results_file_path, json_content.encode())
+            self.sandbox.fs.upload_file(results_file_path, json_content)
 
             return {
                 "url": url,
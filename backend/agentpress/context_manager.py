@@ -1,6 +1,11 @@
 import json
+import os
+from collections import OrderedDict
+from functools import lru_cache
+from hashlib import blake2b
 from typing import Any, Dict, List, Optional
 
+import tiktoken
 from litellm import completion_cost, token_counter
 
 from services.llm import make_llm_api_call
@@ -11,6 +16,73 @@ DEFAULT_TOKEN_THRESHOLD = 120000  # 80k tokens threshold for summarization
 SUMMARY_TARGET_TOKENS = 10000  # Target ~10k tokens for the summary message
 RESERVE_TOKENS = 5000  # Reserve tokens for new messages
 
+# gpt-4 chat format overhead: per message, plus priming for the reply
+TOKENS_PER_MESSAGE = 3
+TOKENS_PER_NAME = 1
+TOKENS_REPLY_PRIMING = 3
+# Number of threads whose per-message token counts are kept in memory
+TOKEN_CACHE_MAX_THREADS = 256
+
+# thread_id -> {message digest: token count}; shared across ContextManager
+# instances so successive runs on a thread only tokenize new messages
+_thread_token_cache: "OrderedDict[str, Dict[bytes, int]]" = OrderedDict()
+
+
+@lru_cache(maxsize=1)
+def _get_encoding() -> tiktoken.Encoding:
+    return tiktoken.get_encoding("cl100k_base")
+
+
+def _message_digest(message: Dict[str, Any]) -> bytes:
+    return blake2b(
+        json.dumps(message, sort_keys=True, default=str).encode(), digest_size=16
+    ).digest()
+
+
+def _count_message_tokens(messages: List[Dict[str, Any]]) -> List[int]:
+    """Count tokens for each message, batching all string fields through tiktoken."""
+    counts = [TOKENS_PER_MESSAGE] * len(messages)
+    texts: List[str] = []
+    owners: List[int] = []
+    for i, message in enumerate(messages):
+        for key, value in message.items():
+            if isinstance(value, str):
+                texts.append(value)
+                owners.append(i)
+                if key == "name":
+                    counts[i] += TOKENS_PER_NAME
+            elif key == "content" and value is not None:
+                # Multimodal / structured content: let litellm handle it
+                counts[i] += (
+                    token_counter(model="gpt-4", messages=[{"content": value}])
+                    - TOKENS_PER_MESSAGE
+                    - TOKENS_REPLY_PRIMING
+                )
+            elif key == "tool_calls" and value:
+                # Function names and argument JSON, as litellm counts them
+                for tool_call in value:
+                    function = (
+                        tool_call.get("function") if isinstance(tool_call, dict) else None
+                    )
+                    if not isinstance(function, dict):
+                        continue
+                    for field in ("name", "arguments"):
+                        text = function.get(field)
+                        if text is None:
+                            continue
+                        if not isinstance(text, str):
+                            text = json.dumps(text)
+                        texts.append(text)
+                        owners.append(i)
+
+    if texts:
+        encoded = _get_encoding().encode_batch(
+            texts, num_threads=os.cpu_count() or 1, disallowed_special=()
+        )
+        for owner, tokens in zip(owners, encoded):
+            counts[owner] += len(tokens)
+    return counts
+
 
 class ContextManager:
     """Manages thread context including token counting and summarization."""
@@ -33,10 +105,24 @@ class ContextManager:
                 logger.debug(f"No messages found for thread {thread_id}")
                 return 0
 
-            token_count = token_counter(model="gpt-4", messages=messages)
+            cached = _thread_token_cache.pop(thread_id, {})
+            digests = [_message_digest(m) for m in messages]
+            misses = [i for i, d in enumerate(digests) if d not in cached]
+            if misses:
+                miss_counts = _count_message_tokens([messages[i] for i in misses])
+                for i, count in zip(misses, miss_counts):
+                    cached[digests[i]] = count
+
+            # Keep only counts for messages still in the thread
+            thread_cache = {d: cached[d] for d in digests}
+            _thread_token_cache[thread_id] = thread_cache
+            while len(_thread_token_cache) > TOKEN_CACHE_MAX_THREADS:
+                _thread_token_cache.popitem(last=False)
+
+            token_count = sum(thread_cache[d] for d in digests) + TOKENS_REPLY_PRIMING
 
             logger.info(
-                f"Thread {thread_id} has {token_count} tokens (calculated with litellm)"
+                f"Thread {thread_id} has {token_count} tokens ({len(misses)} messages tokenized)"
             )
             return token_count
         except Exception as e:
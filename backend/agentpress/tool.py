@@ -1,10 +1,11 @@
-import inspect
-import json
+import logging
 from abc import ABC
 from dataclasses import dataclass, field
 from enum import Enum
 from typing import Any, Dict, List, Optional, Union
 
+import orjson
+
 from utils.logger import logger
 
 
@@ -16,7 +17,7 @@ class SchemaType(Enum):
     CUSTOM = "custom"
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class XMLNodeMapping:
     param_name: str
     node_type: str = "element"
@@ -24,7 +25,7 @@ class XMLNodeMapping:
     required: bool = True
 
 
-@dataclass
+@dataclass(slots=True)
 class XMLTagSchema:
     tag_name: str
     mappings: List[XMLNodeMapping] = field(default_factory=list)
@@ -43,18 +44,22 @@ class XMLTagSchema:
             )
         )
         logger.debug(
-            f"Added XML mapping for parameter '{param_name}' with type '{node_type}' at path '{path}', required={required}"
+            "Added XML mapping for parameter '%s' with type '%s' at path '%s', required=%s",
+            param_name,
+            node_type,
+            path,
+            required,
         )
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class ToolSchema:
     schema_type: SchemaType
     schema: Dict[str, Any]
     xml_schema: Optional[XMLTagSchema] = None
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class ToolResult:
     success: bool
     output: str
@@ -63,16 +68,32 @@ class ToolResult:
 class Tool(ABC):
     def __init__(self):
         self._schemas: Dict[str, List[ToolSchema]] = {}
-        logger.debug(f"Initializing tool class: {self.__class__.__name__}")
+        logger.debug("Initializing tool class: %s", self.__class__.__name__)
         self._register_schemas()
 
+    @classmethod
+    def _class_schemas(cls) -> Dict[str, List[ToolSchema]]:
+        """Collect decorated method schemas once per class by walking its MRO."""
+        schemas = cls.__dict__.get("_schemas_cache")
+        if schemas is None:
+            schemas = {}
+            # Base classes first so overrides in subclasses win
+            for klass in reversed(cls.__mro__):
+                for name, member in vars(klass).items():
+                    if hasattr(member, "tool_schemas"):
+                        schemas[name] = member.tool_schemas
+                    else:
+                        schemas.pop(name, None)
+            if logger.isEnabledFor(logging.DEBUG):
+                for name in schemas:
+                    logger.debug(
+                        "Registered schemas for method '%s' in %s", name, cls.__name__
+                    )
+            cls._schemas_cache = schemas
+        return schemas
+
     def _register_schemas(self):
-        for name, method in inspect.getmembers(self, predicate=inspect.ismethod):
-            if hasattr(method, "tool_schemas"):
-                self._schemas[name] = method.tool_schemas
-                logger.debug(
-                    f"Registered schemas for method '{name}' in {self.__class__.__name__}"
-                )
+        self._schemas.update(self._class_schemas())
 
     def get_schemas(self) -> Dict[str, List[ToolSchema]]:
         return self._schemas
@@ -81,12 +102,14 @@ class Tool(ABC):
         if isinstance(data, str):
             text = data
         else:
-            text = json.dumps(data, indent=2)
-        logger.debug(f"Created success response for {self.__class__.__name__}")
+            text = orjson.dumps(
+                data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS
+            ).decode()
+        logger.debug("Created success response for %s", self.__class__.__name__)
         return ToolResult(success=True, output=text)
 
     def fail_response(self, msg: str) -> ToolResult:
-        logger.debug(f"Tool {self.__class__.__name__} returned failed result: {msg}")
+        logger.debug("Tool %s returned failed result: %s", self.__class__.__name__, msg)
         return ToolResult(success=False, output=msg)
 
 
@@ -94,13 +117,16 @@ def _add_schema(func, schema: ToolSchema):
     if not hasattr(func, "tool_schemas"):
         func.tool_schemas = []
     func.tool_schemas.append(schema)
-    logger.debug(f"Added {schema.schema_type.value} schema to function {func.__name__}")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(
+            "Added %s schema to function %s", schema.schema_type.value, func.__name__
+        )
     return func
 
 
 def openai_schema(schema: Dict[str, Any]):
     def decorator(func):
-        logger.debug(f"Applying OpenAPI schema to function {func.__name__}")
+        logger.debug("Applying OpenAPI schema to function %s", func.__name__)
         return _add_schema(
             func, ToolSchema(schema_type=SchemaType.OPENAPI, schema=schema)
         )
@@ -113,7 +139,7 @@ def xml_schema(
 ):
     def decorator(func):
         logger.debug(
-            f"Applying XML schema with tag '{tag_name}' to function {func.__name__}"
+            "Applying XML schema with tag '%s' to function %s", tag_name, func.__name__
         )
         xml_schema = XMLTagSchema(tag_name=tag_name, example=example)
 
@@ -143,7 +169,7 @@ def custom_schema(schema: Dict[str, Any]):
     """Decorator for custom schema tools."""
 
     def decorator(func):
-        logger.debug(f"Applying custom schema to function {func.__name__}")
+        logger.debug("Applying custom schema to function %s", func.__name__)
         return _add_schema(
             func, ToolSchema(schema_type=SchemaType.CUSTOM, schema=schema)
         )
@@ -78,13 +78,18 @@ class FeatureFlagManager:
         """List all feature flags with their status"""
         try:
             redis_client = await redis.get_client()
-            flag_keys = await redis_client.smembers(self.flag_list_key)
-            flags = {}
+            flag_keys = list(await redis_client.smembers(self.flag_list_key))
 
+            # Fetch every flag's status in a single round trip
+            pipe = redis_client.pipeline(transaction=False)
             for key in flag_keys:
-                flags[key] = await self.is_enabled(key)
+                pipe.hget(f"{self.flag_prefix}{key}", "enabled")
+            enabled_values = await pipe.execute()
 
-            return flags
+            return {
+                key: enabled == "true"
+                for key, enabled in zip(flag_keys, enabled_values)
+            }
         except Exception as e:
             logger.error(f"Failed to list feature flags: {e}")
             return {}
@@ -93,15 +98,19 @@ class FeatureFlagManager:
         """Get all feature flags with detailed information"""
         try:
             redis_client = await redis.get_client()
-            flag_keys = await redis_client.smembers(self.flag_list_key)
-            flags = {}
+            flag_keys = list(await redis_client.smembers(self.flag_list_key))
 
+            # Fetch every flag's details in a single round trip
+            pipe = redis_client.pipeline(transaction=False)
             for key in flag_keys:
-                flag_data = await self.get_flag(key)
-                if flag_data:
-                    flags[key] = flag_data
+                pipe.hgetall(f"{self.flag_prefix}{key}")
+            flag_data_list = await pipe.execute()
 
-            return flags
+            return {
+                key: flag_data
+                for key, flag_data in zip(flag_keys, flag_data_list)
+                if flag_data
+            }
         except Exception as e:
             logger.error(f"Failed to get all flags details: {e}")
             return {}
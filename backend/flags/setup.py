@@ -2,8 +2,8 @@ import argparse
 import asyncio
 import sys
 
-from flags import (delete_flag, disable_flag, enable_flag, get_flag_details,
-                   is_enabled, list_flags)
+from flags import (delete_flag, disable_flag, enable_flag, get_all_flags,
+                   get_flag_details, is_enabled)
 
 
 async def enable_command(flag_name: str, description: str = ""):
@@ -25,20 +25,16 @@ async def disable_command(flag_name: str, description: str = ""):
 
 
 async def list_command():
-    flags = await list_flags()
+    flags = await get_all_flags()
     if not flags:
         print("No feature flags found.")
         return
     print("Feature Flags:")
     print("-" * 50)
-    for flag_name, enabled in flags.items():
-        details = await get_flag_details(flag_name)
-        description = (
-            details.get("description", "No description")
-            if details
-            else "No description"
-        )
-        updated_at = details.get("updated_at", "Unknown") if details else "Unknown"
+    for flag_name, details in flags.items():
+        enabled = details.get("enabled") == "true"
+        description = details.get("description", "No description")
+        updated_at = details.get("updated_at", "Unknown")
 
         status_icon = "✓" if enabled else "✗"
         status_text = "ENABLED" if enabled else "DISABLED"
@@ -54,7 +50,7 @@ async def status_commadn(flag_name: str):
     if not details:
         print(f"✗ Flag '{flag_name}' not found.")
         return
-    enabled = await is_enabled(flag_name)
+    enabled = details.get("enabled") == "true"
     status_icon = "✓" if enabled else "✗"
     status_text = "ENABLED" if enabled else "DISABLED"
     print(f"Flag: {flag_name}")
@@ -1,6 +1,11 @@
+import asyncio
 import logging
+import os
+import re
+import socket
 import sys
 import time
+import uuid
 from collections import OrderedDict
 from contextlib import asynccontextmanager
 
@@ -11,15 +16,42 @@ from fastapi.middleware.cors import CORSMiddleware
 from agent import api as agent_api
 from flags import api as feature_flags_api
 from sandbox import api as sandbox_api
+from sandbox.sandbox import close_daytona_client, sandbox_pool
+from services import redis
 from services.supabase import DBConnection
 from utils.config import config
+from utils.logger import request_id
+
+# Spawned uvicorn workers re-import this module but skip the __main__ block, so
+# the Windows loop policy is set at import. uvicorn's own Windows setup would
+# replace it with the selector policy, so it is told not to touch the loop;
+# elsewhere "auto" picks uvloop when it is installed.
+if sys.platform == "win32":
+    try:
+        import winloop
+
+        asyncio.set_event_loop_policy(winloop.EventLoopPolicy())
+    except ImportError:
+        asyncio.set_event_loop_policy(asyncio.WindowsProactorEventLoopPolicy())
+    UVICORN_LOOP = "none"
+else:
+    UVICORN_LOOP = "auto"
 
 db = DBConnection()
 
 logger = logging.getLogger(__name__)
 load_dotenv()
-instance_id = "single"
+# Unique per process, so each API worker gets its own control channels and keys
+instance_id = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
 ip_tracker = OrderedDict()
+# Client-supplied request ids are echoed and logged, so only short, safe ones
+_REQUEST_ID_RE = re.compile(r"[A-Za-z0-9._-]{1,64}")
+# High-frequency endpoints that bypass request logging entirely
+LOG_SKIP_PATHS = frozenset(
+    p.strip()
+    for p in os.getenv("LOG_SKIP_PATHS", "/health,/api/health,/metrics").split(",")
+    if p.strip()
+)
 
 
 @asynccontextmanager
@@ -28,23 +60,34 @@ async def lifespan(app: FastAPI):
         f"Starting up FastAPI application with instance ID: {instance_id} in {config.ENV_MODE.value} mode"
     )
     try:
-        await db.initialize()
+        # Supabase and Redis handshakes are independent, so run them together
+        db_result, redis_result = await asyncio.gather(
+            db.initialize(), redis.initialize_async(), return_exceptions=True
+        )
+        if isinstance(db_result, Exception):
+            raise db_result
         agent_api.initialize(db, instance_id)
         sandbox_api.initialize(db)
-        from services import redis
 
-        try:
-            await redis.initialize_async()
+        if isinstance(redis_result, Exception):
+            logger.error(f"Failed to initialize Redis connection: {redis_result}")
+        else:
             logger.info("Redis connection initialized successfully")
-        except Exception as e:
-            logger.error(f"Failed to initialize Redis connection: {e}")
-        yield
+        await sandbox_pool.start()
+        try:
+            yield
+        finally:
+            await sandbox_pool.stop()
+            close_daytona_client()
     except Exception as e:
         logger.error(f"Error during application startup: {e}")
         raise
 
 
-allowed_origins = ["https://www.suna.so", "https://suna.so", "http://localhost:3000"]
+# A frozenset makes CORSMiddleware's per-request origin check a hash lookup
+allowed_origins = frozenset(
+    ["https://www.suna.so", "https://suna.so", "http://localhost:3000"]
+)
 allow_origin_regex = None
 
 app = FastAPI(lifespan=lifespan)
@@ -60,29 +103,55 @@ app.add_middleware(
 
 @app.middleware("http")
 async def log_requests_middleware(request: Request, call_next):
-    start_time = time.time()
-    client_ip = request.client.host
-    method = request.method
-    url = str(request.url)
+    # Set once per request; log records pick it up through RequestIdFilter
+    rid = request.headers.get("X-Request-ID")
+    if not rid or not _REQUEST_ID_RE.fullmatch(rid):
+        rid = uuid.uuid4().hex[:16]
+    rid_token = request_id.set(rid)
+    try:
+        response = await _log_request(request, call_next)
+        response.headers["X-Request-ID"] = rid
+        return response
+    finally:
+        request_id.reset(rid_token)
+
+
+async def _log_request(request: Request, call_next):
     path = request.url.path
-    query_params = str(request.query_params)
+    if path in LOG_SKIP_PATHS:
+        return await call_next(request)
+
+    start_time = time.perf_counter()
+    method = request.method
 
     # Log the incoming request
-    logger.info(
-        f"Request started: {method} {path} from {client_ip} | Query: {query_params}"
-    )
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(
+            "Request started: %s %s from %s | Query: %s",
+            method,
+            path,
+            request.client.host if request.client else None,
+            request.url.query,
+        )
 
     try:
         response = await call_next(request)
-        process_time = time.time() - start_time
-        logger.debug(
-            f"Request completed: {method} {path} | Status: {response.status_code} | Time: {process_time:.2f}s"
-        )
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "Request completed: %s %s | Status: %s | Time: %.2fs",
+                method,
+                path,
+                response.status_code,
+                time.perf_counter() - start_time,
+            )
         return response
     except Exception as e:
-        process_time = time.time() - start_time
         logger.error(
-            f"Request failed: {method} {path} | Error: {str(e)} | Time: {process_time:.2f}s"
+            "Request failed: %s %s | Error: %s | Time: %.2fs",
+            method,
+            path,
+            e,
+            time.perf_counter() - start_time,
         )
         raise
 
@@ -95,10 +164,11 @@ app.include_router(feature_flags_api.router, tags=["Feature"], prefix="/api")
 if __name__ == "__main__":
     import uvicorn
 
-    if sys.platform == "win32":
-        asyncio.set_event_loop_policy(asyncio.WindowsProactorEventLoopPolicy())
-
-    workers = 1
+    # Each worker is a separate process with its own DB/Redis pools, set up
+    # in lifespan. Defaults to 1; set WEB_CONCURRENCY to scale out.
+    workers = config.WEB_CONCURRENCY
 
     logger.info(f"Starting server on 0.0.0.0:8000 with {workers} workers")
-    uvicorn.run("api:app", host="0.0.0.0", port=8000, workers=workers, loop="asyncio")
+    uvicorn.run(
+        "main:app", host="0.0.0.0", port=8000, workers=workers, loop=UVICORN_LOOP
+    )
@@ -1,11 +1,13 @@
 import asyncio
 import os
-import json
+import socket
+import time
 import uuid
 from datetime import datetime, timezone
 from typing import Optional
 import traceback
 import dramatiq
+import orjson
 from dotenv import load_dotenv
 from dramatiq.brokers.rabbitmq import RabbitmqBroker
 from agent.run import run_agent
@@ -17,33 +19,67 @@ from utils.logger import logger
 load_dotenv()
 rabbitmq_host = os.getenv("RABBITMQ_HOST", "localhost")
 rabbitmq_port = int(os.getenv("RABBITMQ_PORT", 5672))
+# The broker keeps one pika connection and channel per thread; heartbeats keep
+# idle connections alive so enqueues don't pay a fresh AMQP handshake
 rabbitmq_broker = RabbitmqBroker(
-    host=rabbitmq_host, port=rabbitmq_port, middleware=[
-        dramatiq.middleware.AsyncIO()]
+    host=rabbitmq_host, port=rabbitmq_port,
+    heartbeat=60, blocked_connection_timeout=300,
+    confirm_delivery=False,
+    middleware=[dramatiq.middleware.AsyncIO()]
 )
 dramatiq.set_broker(rabbitmq_broker)
 _initialized = False
+# Connection health is re-checked at most this often (seconds) across messages
+HEALTH_CHECK_INTERVAL = 30
+_last_health_check = 0.0
 db = DBConnection()
-instance_id = "single"
+# Unique per worker process, so each worker gets its own control channels and keys
+instance_id = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+
+# Streamed responses are pushed to Redis in batches of up to STREAM_BATCH_SIZE;
+# at most STREAM_QUEUE_SIZE responses wait for the writer before the run blocks
+STREAM_BATCH_SIZE = int(os.getenv("AGENT_STREAM_BATCH", 16))
+STREAM_QUEUE_SIZE = 256
+
+# The completion status is identical for every run, so serialize it once
+COMPLETION_MESSAGE = {"type": "status", "status": "completed",
+                      "message": "Agent run completed successfully"}
+COMPLETION_MESSAGE_JSON = orjson.dumps(COMPLETION_MESSAGE)
+
+
+def _ensure_broker_connection():
+    """Drop this thread's broker connection if it was closed, so the next use reopens it."""
+    try:
+        if not rabbitmq_broker.connection.is_open:
+            del rabbitmq_broker.connection
+    except Exception as e:
+        logger.warning(f"RabbitMQ connection check failed, will reconnect on next use: {e}")
+        try:
+            del rabbitmq_broker.connection
+        except Exception:
+            pass
 
 
 async def initialize():
     """Initialize the agent API with resources from the main API."""
-    global db, instance_id, _initialized
+    global db, _initialized, _last_health_check
     if _initialized:
+        now = time.monotonic()
+        if now - _last_health_check < HEALTH_CHECK_INTERVAL:
+            return
+        _last_health_check = now
         try:
             await redis.client.ping()
         except Exception as e:
             logger.warning(f"Redis connection failed, re-initializing: {e}")
             await redis.initialize_async(force=True)
+        _ensure_broker_connection()
         return
-    if not instance_id:
-        # Generate instance ID
-        instance_id = str(uuid.uuid4())[:8]
     await redis.initialize_async()
     await db.initialize()
 
     _initialized = True
+    _last_health_check = time.monotonic()
     logger.info(f"Initialized agent API with instance ID: {instance_id}")
 
 
@@ -77,10 +113,11 @@ async def run_agent_background(
         logger.info(
             f"Using custom agent: {agent_config.get('name', 'Unknown')}")
     client = await db.client
-    start_time = datetime.now(timezone.utc)
+    start_time = time.monotonic()
     total_responses = 0
     pubsub = None
     stop_checker = None
+    ttl_refresher = None
     stop_signal_received = False
 
     response_list_key = f"agent_run:{agent_run_id}:responses"
@@ -94,29 +131,19 @@ async def run_agent_background(
         if not pubsub:
             return
         try:
-            while not stop_signal_received:
-                message = await pubsub.get_message(
-                    ignore_subscribe_messages=True, timeout=0.5
-                )
-                if message and message.get("type") == "message":
-                    data = message.get("data")
-                    if isinstance(data, bytes):
-                        data = data.decode("utf-8")
-                    if data == "STOP":
-                        logger.info(
-                            f"Received STOP signal for agent run {agent_run_id} (Instance: {instance_id})"
-                        )
-                        stop_signal_received = True
-                        break
-                # Periodically refresh the active run key TTL
-                if total_responses % 50 == 0:  # Refresh every 50 responses or so
-                    try:
-                        await redis.expire(instance_active_key, redis.REDIS_KEY_TTL)
-                    except Exception as ttl_err:
-                        logger.warning(
-                            f"Failed to refresh TTL for {instance_active_key}: {ttl_err}"
-                        )
-                await asyncio.sleep(0.1)  # Short sleep to prevent tight loop
+            # listen() wakes only when a message arrives, so idle runs cost nothing
+            async for message in pubsub.listen():
+                if message.get("type") != "message":
+                    continue
+                data = message.get("data")
+                if isinstance(data, bytes):
+                    data = data.decode("utf-8")
+                if data == "STOP":
+                    logger.info(
+                        f"Received STOP signal for agent run {agent_run_id} (Instance: {instance_id})"
+                    )
+                    stop_signal_received = True
+                    break
         except asyncio.CancelledError:
             logger.info(
                 f"Stop signal checker cancelled for {agent_run_id} (Instance: {instance_id})"
@@ -126,6 +153,29 @@ async def run_agent_background(
                 f"Error in stop signal checker for {agent_run_id}: {e}", exc_info=True
             )
             stop_signal_received = True  # Stop the run if the checker fails
+
+    async def refresh_active_key():
+        """Keep the active run key alive for as long as the run lasts."""
+        try:
+            while not stop_signal_received:
+                await asyncio.sleep(redis.REDIS_KEY_TTL / 3)
+                try:
+                    await redis.expire(instance_active_key, redis.REDIS_KEY_TTL)
+                except Exception as ttl_err:
+                    logger.warning(
+                        f"Failed to refresh TTL for {instance_active_key}: {ttl_err}"
+                    )
+        except asyncio.CancelledError:
+            pass
+
+    # Every response pushed to Redis, kept for the final agent_runs update
+    collected_responses: list[dict] = []
+    # Streamed responses go through a bounded queue to a single writer task,
+    # which applies backpressure and pushes whatever has queued up as one batch
+    write_q: asyncio.Queue = asyncio.Queue(maxsize=STREAM_QUEUE_SIZE)
+    writer = asyncio.create_task(
+        _response_writer(write_q, response_list_key, response_channel))
+
     trace = langfuse.trace(name="agent_run", id=agent_run_id, session_id=thread_id, metadata={
                            "project_id": project_id, "instance_id": instance_id})
     try:
@@ -134,6 +184,7 @@ async def run_agent_background(
         logger.debug(
             f"Subscribed to control channels: {instance_control_channel}, {global_control_channel}")
         stop_checker = asyncio.create_task(check_for_stop_signal())
+        ttl_refresher = asyncio.create_task(refresh_active_key())
         await redis.set(instance_active_key, "running", ex=redis.REDIS_KEY_TTL)
         agent_gen = run_agent(
             thread_id=thread_id, project_id=project_id, stream=stream,
@@ -147,7 +198,10 @@ async def run_agent_background(
         )
         final_status = "running"
         error_message = None
-        pending_redis_operations = []
+        # Local bindings for the per-response hot loop
+        dumps = orjson.dumps
+        collect = collected_responses.append
+        enqueue = write_q.put
         async for response in agent_gen:
             if stop_signal_received:
                 logger.info(f"Agent run {agent_run_id} stopped by signal.")
@@ -155,11 +209,8 @@ async def run_agent_background(
                 trace.span(name="agent_run_stopped").end(
                     status_message="agent_run_stopped", level="WARNING")
                 break
-            response_json = json.dumps(response)
-            pending_redis_operations.append(asyncio.create_task(
-                redis.rpush(response_list_key, response_json)))
-            pending_redis_operations.append(asyncio.create_task(
-                redis.publish(response_channel, "new")))
+            collect(response)
+            await enqueue(dumps(response))
             total_responses += 1
             if response.get('type') == 'status':
                 status_val = response.get('status')
@@ -174,20 +225,16 @@ async def run_agent_background(
 
         if final_status == "running":
             final_status = "completed"
-            duration = (datetime.now(timezone.utc) -
-                        start_time).total_seconds()
+            duration = time.monotonic() - start_time
             logger.info(
                 f"Agent run {agent_run_id} completed normally (duration: {duration:.2f}s, responses: {total_responses})")
-            completion_message = {"type": "status", "status": "completed",
-                                  "message": "Agent run completed successfully"}
             trace.span(name="agent_run_completed").end(
                 status_message="agent_run_completed")
-            await redis.rpush(response_list_key, json.dumps(completion_message))
-            # Notify about the completion message
-            await redis.publish(response_channel, "new")
-        all_responses_json = await redis.lrange(response_list_key, 0, -1)
-        all_responses = [json.loads(r) for r in all_responses_json]
-        await update_agent_run_status(client, agent_run_id, final_status, error=error_message, responses=all_responses)
+            await write_q.put(COMPLETION_MESSAGE_JSON)
+            collected_responses.append(dict(COMPLETION_MESSAGE))
+        # Make sure every response is in Redis before signalling the end of the stream
+        await write_q.join()
+        await update_agent_run_status(client, agent_run_id, final_status, error=error_message, responses=collected_responses)
         control_signal = "END_STREAM" if final_status == "completed" else "ERROR" if final_status == "failed" else "STOP"
         try:
             await redis.publish(global_control_channel, control_signal)
@@ -201,7 +248,7 @@ async def run_agent_background(
     except Exception as e:
         error_message = str(e)
         traceback_str = traceback.format_exc()
-        duration = (datetime.now(timezone.utc) - start_time).total_seconds()
+        duration = time.monotonic() - start_time
         logger.error(
             f"Error in agent run {agent_run_id} after {duration:.2f}s: {error_message}\n{traceback_str} (Instance: {instance_id})")
         final_status = "failed"
@@ -210,22 +257,11 @@ async def run_agent_background(
 
         error_response = {"type": "status",
                           "status": "error", "message": error_message}
-        try:
-            await redis.rpush(response_list_key, json.dumps(error_response))
-            await redis.publish(response_channel, "new")
-        except Exception as redis_err:
-            logger.error(
-                f"Failed to push error response to Redis for {agent_run_id}: {redis_err}")
-        all_responses = []
-        try:
-            all_responses_json = await redis.lrange(response_list_key, 0, -1)
-            all_responses = [json.loads(r) for r in all_responses_json]
-        except Exception as fetch_err:
-            logger.error(
-                f"Failed to fetch responses from Redis after error for {agent_run_id}: {fetch_err}")
-            # Use the error message we tried to push
-            all_responses = [error_response]
-        await update_agent_run_status(client, agent_run_id, "failed", error=f"{error_message}\n{traceback_str}", responses=all_responses)
+        if not writer.done():
+            await write_q.put(orjson.dumps(error_response))
+            await write_q.join()
+        collected_responses.append(error_response)
+        await update_agent_run_status(client, agent_run_id, "failed", error=f"{error_message}\n{traceback_str}", responses=collected_responses)
 
         # Publish ERROR signal
         try:
@@ -234,6 +270,15 @@ async def run_agent_background(
         except Exception as e:
             logger.warning(f"Failed to publish ERROR signal: {str(e)}")
     finally:
+        if not writer.done():
+            await write_q.put(None)
+        try:
+            await asyncio.wait_for(writer, timeout=5.0)
+        except asyncio.TimeoutError:
+            logger.warning(
+                f"Timeout waiting for pending Redis operations for {agent_run_id}")
+        if ttl_refresher and not ttl_refresher.done():
+            ttl_refresher.cancel()
         if stop_checker and not stop_checker.done():
             stop_checker.cancel()
             try:
@@ -250,18 +295,49 @@ async def run_agent_background(
             except Exception as e:
                 logger.warning(
                     f"Error closing pubsub for {agent_run_id}: {str(e)}")
-        await _cleanup_redis_response_list(agent_run_id)
-        await _cleanup_redis_instance_key(agent_run_id)
-        try:
-            await asyncio.wait_for(asyncio.gather(*pending_redis_operations), timeout=30.0)
-        except asyncio.TimeoutError:
-            logger.warning(
-                f"Timeout waiting for pending Redis operations for {agent_run_id}")
+        # Key cleanup doesn't affect the run's outcome, so don't hold the actor for it
+        _schedule_redis_cleanup(agent_run_id, instance_id, bool(collected_responses))
 
         logger.info(
             f"Agent run background task fully completed for: {agent_run_id} (Instance: {instance_id}) with final status: {final_status}")
 
 
+async def _response_writer(write_q: asyncio.Queue, response_list_key: str, response_channel: str):
+    """Drain the run's response queue into Redis until a None sentinel arrives."""
+    while True:
+        item = await write_q.get()
+        batch = []
+        stop = item is None
+        if not stop:
+            batch.append(item)
+        # Everything that queued up during the previous push goes out together
+        while not stop and len(batch) < STREAM_BATCH_SIZE and not write_q.empty():
+            item = write_q.get_nowait()
+            if item is None:
+                stop = True
+            else:
+                batch.append(item)
+        try:
+            if batch:
+                await _push_responses(response_list_key, response_channel, *batch)
+        except Exception as e:
+            logger.error(
+                f"Failed to push {len(batch)} responses to {response_list_key}: {e}")
+        finally:
+            for _ in range(len(batch) + stop):
+                write_q.task_done()
+        if stop:
+            return
+
+
+async def _push_responses(response_list_key: str, response_channel: str, *response_jsons: bytes):
+    """Append responses to the run's list and notify subscribers in a single pipelined round trip."""
+    return await redis.pipeline_execute((
+        ("rpush", (response_list_key, *response_jsons), {}),
+        ("publish", (response_channel, "new"), {}),
+    ))
+
+
 async def update_agent_run_status(
     client,
     agent_run_id: str,
@@ -283,28 +359,19 @@ async def update_agent_run_status(
             update_data["responses"] = responses
         for retry in range(3):
             try:
+                # PostgREST returns the updated row, so no follow-up select is needed
                 update_result = await client.table('agent_runs').update(update_data).eq("id", agent_run_id).execute()
 
                 if hasattr(update_result, 'data') and update_result.data:
+                    updated_row = update_result.data[0]
                     logger.info(
-                        f"Successfully updated agent run {agent_run_id} status to '{status}' (retry {retry})")
-
-                    # Verify the update
-                    verify_result = await client.table('agent_runs').select('status', 'completed_at').eq("id", agent_run_id).execute()
-                    if verify_result.data:
-                        actual_status = verify_result.data[0].get('status')
-                        completed_at = verify_result.data[0].get(
-                            'completed_at')
-                        logger.info(
-                            f"Verified agent run update: status={actual_status}, completed_at={completed_at}")
+                        f"Successfully updated agent run {agent_run_id} status to '{updated_row.get('status')}' "
+                        f"(completed_at={updated_row.get('completed_at')}, retry {retry})")
                     return True
-                else:
-                    logger.warning(
-                        f"Database update returned no data for agent run {agent_run_id} on retry {retry}: {update_result}")
-                    if retry == 2:  # Last retry
-                        logger.error(
-                            f"Failed to update agent run status after all retries: {agent_run_id}")
-                        return False
+                # No matching row; retrying won't change that
+                logger.error(
+                    f"Database update returned no data for agent run {agent_run_id}: {update_result}")
+                return False
             except Exception as db_error:
                 logger.error(
                     f"Database error on retry {retry} updating status for {agent_run_id}: {str(db_error)}")
@@ -323,29 +390,32 @@ async def update_agent_run_status(
     return False
 
 
-async def _cleanup_redis_instance_key(agent_run_id: str):
-    """Clean up the instance-specific Redis key for an agent run."""
-    if not instance_id:
-        logger.warning("Instance ID not set, cannot clean up instance key.")
-        return
-    key = f"active_run:{instance_id}:{agent_run_id}"
-    logger.debug(f"Cleaning up Redis instance key: {key}")
-    try:
-        await redis.delete(key)
-        logger.debug(f"Successfully cleaned up Redis key: {key}")
-    except Exception as e:
-        logger.warning(f"Failed to clean up Redis key {key}: {str(e)}")
-
 REDIS_RESPONSE_LIST_TTL = 3600 * 24
 
+# Strong references to fire-and-forget cleanup tasks so they aren't garbage collected
+_background_tasks: set[asyncio.Task] = set()
+
+
+async def _cleanup_redis_run_keys(agent_run_id: str, instance_id: str, wrote_responses: bool = True):
+    """Set TTL on the run's response list and delete its active-run key in one round trip.
 
-async def _cleanup_redis_response_list(agent_run_id: str):
-    """Set TTL on the Redis response list."""
+    The EXPIRE is skipped when the run never pushed a response, since the list doesn't exist.
+    """
     response_list_key = f"agent_run:{agent_run_id}:responses"
+    instance_active_key = f"active_run:{instance_id}:{agent_run_id}"
     try:
-        await redis.expire(response_list_key, REDIS_RESPONSE_LIST_TTL)
+        ops = [("delete", (instance_active_key,), {})]
+        if wrote_responses:
+            ops.insert(0, ("expire", (response_list_key, REDIS_RESPONSE_LIST_TTL), {}))
+        await redis.pipeline_execute(ops)
         logger.debug(
-            f"Set TTL ({REDIS_RESPONSE_LIST_TTL}s) on response list: {response_list_key}")
+            f"Set TTL ({REDIS_RESPONSE_LIST_TTL}s) on {response_list_key} and deleted {instance_active_key}")
     except Exception as e:
         logger.warning(
-            f"Failed to set TTL on response list {response_list_key}: {str(e)}")
+            f"Failed to clean up Redis keys for agent run {agent_run_id}: {str(e)}")
+
+
+def _schedule_redis_cleanup(agent_run_id: str, instance_id: str, wrote_responses: bool = True):
+    task = asyncio.create_task(_cleanup_redis_run_keys(agent_run_id, instance_id, wrote_responses))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
@@ -1,3 +1,11 @@
+import asyncio
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from daytona_api_client import rest
 from daytona_api_client.models.workspace_state import WorkspaceState
 from daytona_sdk import (CreateSandboxParams, Daytona, DaytonaConfig, Sandbox,
                          SessionExecuteRequest)
@@ -31,60 +39,106 @@ if daytona_config.target:
 else:
     logger.warning("No Daytona target found in environment variables")
 daytona = Daytona(daytona_config)
+
+# Sandbox and toolbox calls all go through daytona.api_client, but they run
+# from worker threads (_run_blocking). urllib3 drops connections beyond the
+# pool's maxsize, so size it for that concurrency to keep TLS sessions warm.
+# Split across API workers so the host-wide connection count stays the same
+DAYTONA_POOL_MAXSIZE = max(8, 64 // config.WEB_CONCURRENCY)
+daytona.api_client.configuration.connection_pool_maxsize = DAYTONA_POOL_MAXSIZE
+daytona.api_client.rest_client = rest.RESTClientObject(daytona.api_client.configuration)
 logger.debug("Daytona client initialized")
+# The SDK is synchronous; its calls run on a dedicated pool so multi-second
+# container operations never block the event loop or starve the default executor
+_DAYTONA_EXECUTOR = ThreadPoolExecutor(
+    max_workers=max(4, 32 // config.WEB_CONCURRENCY), thread_name_prefix="daytona"
+)
+# Bounds concurrent blocking Daytona calls fanned out to worker threads
+_daytona_ops = asyncio.Semaphore(config.SANDBOX_MAX_CONCURRENT_OPS)
+
+
+async def _run_blocking(func, *args):
+    return await asyncio.get_running_loop().run_in_executor(
+        _DAYTONA_EXECUTOR, func, *args
+    )
+
+
+def close_daytona_client():
+    """Drop pooled Daytona connections and worker threads on shutdown."""
+    _DAYTONA_EXECUTOR.shutdown(wait=False, cancel_futures=True)
+    daytona.api_client.rest_client.pool_manager.clear()
+
+
+# States a sandbox must be started from before it can be used
+_RESUMABLE_STATES = frozenset((WorkspaceState.ARCHIVED, WorkspaceState.STOPPED))
 
 
 async def get_or_start_sandbox(sandbox_id: str):
     logger.info(f"Getting or starting sandbox with ID: {sandbox_id}")
     try:
-        sandbox = daytona.get_current_sandbox(sandbox_id)
-        if (
-            sandbox.instance.state == WorkspaceState.ARCHIVED
-            or sandbox.instance.state == WorkspaceState.STOPPED
-        ):
-            logger.info(f"Sandbox is in {sandbox.instance.state} state. Starting...")
-            try:
-                daytona.start(sandbox)
+        sandbox = await _run_blocking(daytona.get_current_sandbox, sandbox_id)
+    except Exception:
+        logger.exception(f"Error retrieving sandbox {sandbox_id}")
+        raise
+
+    state = sandbox.instance.state
+    if state not in _RESUMABLE_STATES:
+        return sandbox
+
+    logger.info(f"Sandbox is in {state} state. Starting...")
+    started_at = time.monotonic()
+    try:
+        await _run_blocking(daytona.start, sandbox)
+        sandbox = await _run_blocking(daytona.get_current_sandbox, sandbox_id)
+        await _run_blocking(start_supervisord_session, sandbox)
+    except Exception:
+        logger.exception(f"Error starting sandbox {sandbox_id}")
+        raise
+    if state == WorkspaceState.ARCHIVED:
+        await _run_blocking(_keep_warm_if_slow, sandbox, time.monotonic() - started_at)
+    return sandbox
+
 
-                sandbox = daytona.get_current_sandbox(sandbox_id)
+def _keep_warm_if_slow(sandbox: Sandbox, start_seconds: float):
+    """Keep a sandbox whose archive restore was slow in the stopped tier longer.
 
-                start_supervisord_session(sandbox)
-            except:
-                logger.error(f"Error starting sandbox: {e}")
-                raise e
+    Restarting a stopped sandbox reuses its disk, while an archived one is
+    restored from object storage. Only sandboxes whose cold restore cost more
+    than SANDBOX_SLOW_START_SECONDS are worth the extra stopped-disk time.
+    """
+    logger.info(f"Sandbox {sandbox.id} restored from archive in {start_seconds:.1f}s")
+    if start_seconds < config.SANDBOX_SLOW_START_SECONDS:
+        return
+    try:
+        sandbox.set_auto_archive_interval(config.SANDBOX_WARM_ARCHIVE_INTERVAL)
     except Exception as e:
-        logger.error(f"Error retrieving or starting sandbox: {str(e)}")
-        raise e
+        logger.warning(f"Failed to extend auto-archive for sandbox {sandbox.id}: {e}")
+
+
+SUPERVISORD_SESSION_ID = "supervisord-session"
+# The SDK only serializes the request, so one instance serves every sandbox
+_SUPERVISORD_REQUEST = SessionExecuteRequest(
+    command="exec /usr/bin/supervisord -n -c /etc/supervisor/conf.d/supervisord.conf",
+    var_async=True,
+)
 
 
 def start_supervisord_session(sandbox: Sandbox):
-    session_id = "supervisord-session"
+    session_id = SUPERVISORD_SESSION_ID
     try:
-        logger.info(f"Creating session {session_id} for supervisord")
+        logger.debug(f"Creating session {session_id} for supervisord")
         sandbox.process.create_session(session_id)
 
         # Execute supervisord command
-        sandbox.process.execute_session_command(
-            session_id,
-            SessionExecuteRequest(
-                command="exec /usr/bin/supervisord -n -c /etc/supervisor/conf.d/supervisord.conf",
-                var_async=True,
-            ),
-        )
-        logger.info(f"Supervisord started in session {session_id}")
+        sandbox.process.execute_session_command(session_id, _SUPERVISORD_REQUEST)
+        logger.debug(f"Supervisord started in session {session_id}")
     except Exception as e:
         logger.error(f"Error starting supervisord session: {str(e)}")
         raise e
 
 
-def create_sandbox(password: str, project_id: str = None):
-    logger.debug("Creating new Daytona sandbox environment")
-    logger.debug("Configuring sandbox with browser-use image and environment variables")
-    labels = None
-    if project_id:
-        logger.debug(f"Using sandbox_id as label: {project_id}")
-        labels = {"id": project_id}
-    params = CreateSandboxParams(
+def _sandbox_params(password: str, labels: Optional[Dict[str, str]] = None):
+    return CreateSandboxParams(
         image=Configuration.SANDBOX_IMAGE_NAME,
         public=True,
         labels=labels,
@@ -108,7 +162,16 @@ def create_sandbox(password: str, project_id: str = None):
         },
     )
 
-    sandbox = daytona.create(params)
+
+def create_sandbox(password: str, project_id: str = None):
+    logger.debug("Creating new Daytona sandbox environment")
+    logger.debug("Configuring sandbox with browser-use image and environment variables")
+    labels = None
+    if project_id:
+        logger.debug(f"Using sandbox_id as label: {project_id}")
+        labels = {"id": project_id}
+
+    sandbox = daytona.create(_sandbox_params(password, labels))
     logger.debug(f"Sandbox created with ID: {sandbox.id}")
     start_supervisord_session(sandbox)
 
@@ -116,16 +179,187 @@ def create_sandbox(password: str, project_id: str = None):
     return sandbox
 
 
+@dataclass(slots=True)
+class PooledSandbox:
+    sandbox: Sandbox
+    password: str
+    created_at: float = field(default_factory=time.monotonic)
+
+
+class WarmSandboxPool:
+    """Keeps a few started, unclaimed sandboxes ready for new projects.
+
+    Sandboxes are labelled and get their VNC password at creation, so a pooled
+    sandbox is created with its own random password and labelled with the
+    project id when it is claimed. Each one is handed out exactly once.
+    Every worker process runs its own pool, so ``pool_size`` is per process.
+    """
+
+    def __init__(
+        self,
+        pool_size: int = 0,
+        max_age_seconds: int = 1800,
+        health_check_interval: int = 60,
+    ):
+        self.pool_size = pool_size
+        self.max_age_seconds = max_age_seconds
+        self.health_check_interval = health_check_interval
+        self._queue: Optional[asyncio.Queue] = None
+        self._refill = asyncio.Event()
+        # Serializes refills with health checks, which drain the queue while
+        # they probe; acquire() only takes from the queue and needs no lock
+        self._lock = asyncio.Lock()
+        self._tasks: list = []
+        # Strong references keep fire-and-forget removals from being collected
+        self._removals: set = set()
+        self._stats = {"created": 0, "reused": 0, "recycled": 0, "misses": 0}
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return dict(self._stats, idle=self._queue.qsize() if self._queue else 0)
+
+    async def start(self):
+        if self.pool_size <= 0 or self._tasks:
+            return
+        self._queue = asyncio.Queue(maxsize=self.pool_size)
+        self._refill.set()
+        self._tasks = [
+            asyncio.create_task(self._warmup_task()),
+            asyncio.create_task(self._health_check_loop()),
+        ]
+        logger.info(f"Warm sandbox pool started with size {self.pool_size}")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._queue is None:
+            return
+        idle = []
+        while not self._queue.empty():
+            idle.append(self._queue.get_nowait())
+        await asyncio.gather(
+            *(self._remove(pooled) for pooled in idle),
+            *self._removals,
+            return_exceptions=True,
+        )
+        logger.info(f"Warm sandbox pool stopped: {self._stats}")
+
+    async def acquire(self, project_id: str) -> Tuple[Sandbox, str]:
+        """Return a started sandbox labelled for ``project_id`` and its VNC password."""
+        while self._queue is not None and not self._queue.empty():
+            pooled = self._queue.get_nowait()
+            self._refill.set()
+            if time.monotonic() - pooled.created_at > self.max_age_seconds:
+                self._schedule_remove(pooled)
+                continue
+            try:
+                await _run_blocking(pooled.sandbox.set_labels, {"id": project_id})
+            except Exception as e:
+                logger.warning(f"Discarding pooled sandbox {pooled.sandbox.id}: {e}")
+                self._schedule_remove(pooled)
+                continue
+            self._stats["reused"] += 1
+            logger.debug(f"Using pooled sandbox {pooled.sandbox.id} for {project_id}")
+            return pooled.sandbox, pooled.password
+
+        self._stats["misses"] += 1
+        password = uuid.uuid4().hex
+        sandbox = await _run_blocking(create_sandbox, password, project_id)
+        return sandbox, password
+
+    async def _warmup_task(self):
+        while True:
+            await self._refill.wait()
+            async with self._lock:
+                if self._queue.full():
+                    self._refill.clear()
+                    continue
+                password = uuid.uuid4().hex
+                try:
+                    sandbox = await _run_blocking(create_sandbox, password)
+                except Exception as e:
+                    logger.error(f"Failed to warm sandbox: {e}")
+                    sandbox = None
+                if sandbox is not None:
+                    self._stats["created"] += 1
+                    pooled = PooledSandbox(sandbox, password)
+                    try:
+                        self._queue.put_nowait(pooled)
+                    except asyncio.QueueFull:
+                        # Never leave a billed sandbox untracked
+                        self._schedule_remove(pooled)
+            if sandbox is None:
+                await asyncio.sleep(self.health_check_interval)
+
+    async def _health_check_loop(self):
+        while True:
+            await asyncio.sleep(self.health_check_interval)
+            async with self._lock:
+                idle = []
+                while not self._queue.empty():
+                    idle.append(self._queue.get_nowait())
+                healthy = await asyncio.gather(*(self._is_healthy(p) for p in idle))
+                for pooled, ok in zip(idle, healthy):
+                    if ok:
+                        self._queue.put_nowait(pooled)
+                    else:
+                        self._schedule_remove(pooled)
+            self._refill.set()
+
+    async def _is_healthy(self, pooled: PooledSandbox) -> bool:
+        if time.monotonic() - pooled.created_at > self.max_age_seconds:
+            return False
+        try:
+            sandbox = await _run_blocking(
+                daytona.get_current_sandbox, pooled.sandbox.id
+            )
+            return sandbox.instance.state == WorkspaceState.STARTED
+        except Exception:
+            return False
+
+    def _schedule_remove(self, pooled: PooledSandbox):
+        task = asyncio.create_task(self._remove(pooled))
+        self._removals.add(task)
+        task.add_done_callback(self._removals.discard)
+
+    async def _remove(self, pooled: PooledSandbox):
+        self._stats["recycled"] += 1
+        try:
+            async with _daytona_ops:
+                await _run_blocking(daytona.remove, pooled.sandbox)
+        except Exception as e:
+            logger.warning(f"Failed to remove pooled sandbox {pooled.sandbox.id}: {e}")
+
+
+sandbox_pool = WarmSandboxPool(
+    pool_size=config.SANDBOX_POOL_SIZE,
+    max_age_seconds=config.SANDBOX_POOL_MAX_AGE,
+)
+
+
 async def delete_sandbox(sandbox_id: str):
     logger.info(f"Deleting sandbox with ID: {sandbox_id}")
 
     try:
-        sandbox = daytona.get_current_sandbox(sandbox_id)
-
-        daytona.remove(sandbox)
+        async with _daytona_ops:
+            sandbox = await _run_blocking(daytona.get_current_sandbox, sandbox_id)
+            await _run_blocking(daytona.remove, sandbox)
 
         logger.info(f"Successfully deleted sandbox {sandbox_id}")
         return True
     except Exception as e:
         logger.error(f"Error deleting sandbox {sandbox_id}: {str(e)}")
         raise e
+
+
+async def bulk_delete_sandboxes(sandbox_ids: List[str]) -> Dict[str, bool]:
+    """Delete many sandboxes concurrently, at most SANDBOX_MAX_CONCURRENT_OPS at a time."""
+    results = await asyncio.gather(
+        *(delete_sandbox(sandbox_id) for sandbox_id in sandbox_ids),
+        return_exceptions=True,
+    )
+    return {
+        sandbox_id: result is True for sandbox_id, result in zip(sandbox_ids, results)
+    }
@@ -1,9 +1,18 @@
 import asyncio
+import copy
 import json
 import os
+import random
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from hashlib import blake2b
+from importlib.metadata import PackageNotFoundError, version
 from typing import Any, AsyncGenerator, Dict, List, Optional, Union
 
 import litellm
+import orjson
 from openai import OpenAIError
 
 from utils.config import config
@@ -14,6 +23,29 @@ litellm.modify_params = True
 MAX_RETRIES = 2
 RATE_LIMIT_DELAY = 30
 RETRY_DELAY = 0.1
+RATE_LIMIT_JITTER = 5
+_RETRYABLE_ERRORS = (
+    litellm.exceptions.RateLimitError,
+    OpenAIError,
+    json.JSONDecodeError,
+)
+# setup_api_keys() runs on the first LLM call rather than at import
+_keys_initialized = False
+# Shared cooldown: after a 429 every caller waits until this monotonic time
+_rate_limit_until = 0.0
+# Identical non-streaming requests currently in flight, keyed by request hash
+_inflight: Dict[str, asyncio.Future] = {}
+# Shared by every cache breakpoint; treat as read-only
+EPHEMERAL = {"type": "ephemeral"}
+# Deterministic (temperature 0) responses, keyed by the same hash
+LLM_CACHE_SIZE = 256
+LLM_CACHE_TTL = 600
+_response_cache: "OrderedDict[str, tuple]" = OrderedDict()
+try:
+    # Part of every request hash, so a litellm upgrade invalidates the cache
+    _CACHE_VERSION = version("litellm").encode()
+except PackageNotFoundError:
+    _CACHE_VERSION = b"unknown"
 
 
 class LLMError(Exception):
@@ -24,43 +56,162 @@ class LLMRetryError(LLMError):
     pass
 
 
+_PROVIDER_KEYS = (
+    ("OPENAI", config.OPENAI_API_KEY),
+    ("ANTHROPIC", config.ANTHROPIC_API_KEY),
+    ("GROQ", config.GROQ_API_KEY),
+    ("OPENROUTER", config.OPENROUTER_API_KEY),
+)
+_HAS_AWS_CREDENTIALS = bool(
+    config.AWS_ACCESS_KEY_ID and config.AWS_SECRET_ACCESS_KEY and config.AWS_REGION_NAME
+)
+# Environment exports litellm reads, resolved once from config
+_ENV_UPDATES = {
+    key: value
+    for key, value in (
+        (
+            "OPENROUTER_API_BASE",
+            config.OPENROUTER_API_BASE if config.OPENROUTER_API_KEY else None,
+        ),
+        ("AWS_ACCESS_KEY_ID", config.AWS_ACCESS_KEY_ID if _HAS_AWS_CREDENTIALS else None),
+        (
+            "AWS_SECRET_ACCESS_KEY",
+            config.AWS_SECRET_ACCESS_KEY if _HAS_AWS_CREDENTIALS else None,
+        ),
+        ("AWS_REGION_NAME", config.AWS_REGION_NAME if _HAS_AWS_CREDENTIALS else None),
+    )
+    if value
+}
+
+
 def setup_api_keys() -> None:
-    providers = ["OPENAI", "ANTHROPIC", "GROQ", "OPENROUTER"]
-    for provider in providers:
-        key = getattr(config, f"{provider}_API_KEY")
+    for provider, key in _PROVIDER_KEYS:
         if key:
             logger.debug(f"API key set for provider: {provider}")
         else:
             logger.warning(f"No API key found for provider: {provider}")
 
-    if config.OPENROUTER_API_KEY and config.OPENROUTER_API_BASE:
-        os.environ["OPENROUTER_API_BASE"] = config.OPENROUTER_API_BASE
+    os.environ.update(_ENV_UPDATES)
+    if "OPENROUTER_API_BASE" in _ENV_UPDATES:
         logger.debug(f"Set OPENROUTER_API_BASE to {config.OPENROUTER_API_BASE}")
-    aws_access_key = config.AWS_ACCESS_KEY_ID
-    aws_secret_key = config.AWS_SECRET_ACCESS_KEY
-    aws_region = config.AWS_REGION_NAME
-    if aws_access_key and aws_secret_key and aws_region:
-        logger.debug(f"AWS credentials set for Bedrock in region: {aws_region}")
-        os.environ["AWS_ACCESS_KEY_ID"] = aws_access_key
-        os.environ["AWS_SECRET_ACCESS_KEY"] = aws_secret_key
-        os.environ["AWS_REGION_NAME"] = aws_region
+    if _HAS_AWS_CREDENTIALS:
+        logger.debug(f"AWS credentials set for Bedrock in region: {config.AWS_REGION_NAME}")
     else:
         logger.warning(
-            f"Missing AWS credentials for Bedrock integration - access_key: {bool(aws_access_key)}, secret_key: {bool(aws_secret_key)}, region: {aws_region}"
+            f"Missing AWS credentials for Bedrock integration - access_key: {bool(config.AWS_ACCESS_KEY_ID)}, secret_key: {bool(config.AWS_SECRET_ACCESS_KEY)}, region: {config.AWS_REGION_NAME}"
         )
 
 
-async def handle_error(error: Exception, attempt: int, max_attempts: int) -> None:
-    delay = (
-        RATE_LIMIT_DELAY
-        if isinstance(error, litellm.exceptions.RateLimitError)
-        else RETRY_DELAY
+@dataclass(frozen=True, slots=True)
+class ModelMeta:
+    is_anthropic: bool
+    is_bedrock: bool
+    is_openrouter: bool
+    skip_max_tokens: bool
+    max_tokens_param: str
+    bedrock_model_id: Optional[str]
+    extra_headers: Optional[Dict[str, str]]
+
+
+@lru_cache(maxsize=64)
+def classify_model(model_name: str) -> ModelMeta:
+    """Derive the provider-specific handling for a model name once."""
+    model_lower = model_name.lower()
+    is_anthropic = "claude" in model_lower or "anthropic" in model_lower
+    is_bedrock = model_name.startswith("bedrock/")
+    is_openrouter = model_name.startswith("openrouter/")
+    # Static per-model headers; prepare_params copies them into each request
+    extra_headers = {}
+    if is_anthropic:
+        # "anthropic-beta": "max-tokens-3-5-sonnet-2024-07-15"
+        extra_headers["anthropic-beta"] = "output-128k-2025-02-19"
+    if is_openrouter:
+        if config.OR_SITE_URL:
+            extra_headers["HTTP-Referer"] = config.OR_SITE_URL
+        if config.OR_APP_NAME:
+            extra_headers["X-Title"] = config.OR_APP_NAME
+    return ModelMeta(
+        is_anthropic=is_anthropic,
+        is_bedrock=is_bedrock,
+        is_openrouter=is_openrouter,
+        skip_max_tokens=is_bedrock and "claude-3-7" in model_name,
+        max_tokens_param="max_completion_tokens" if "o1" in model_name else "max_tokens",
+        bedrock_model_id=(
+            "arn:aws:bedrock:us-west-2:935064898258:inference-profile/us.anthropic.claude-3-7-sonnet-20250219-v1:0"
+            if is_bedrock and "anthropic.claude-3-7-sonnet" in model_name
+            else None
+        ),
+        extra_headers=extra_headers or None,
     )
+
+
+async def handle_error(error: Exception, attempt: int, max_attempts: int) -> None:
+    global _rate_limit_until
     logger.warning(f"Error on attempt {attempt + 1}/{max_attempts}: {str(error)}")
-    logger.debug(f"Waiting {delay} seconds before retry...")
+    if isinstance(error, litellm.exceptions.RateLimitError):
+        # Jitter the shared gate so waiting callers don't all retry at once
+        _rate_limit_until = max(
+            _rate_limit_until,
+            time.monotonic() + RATE_LIMIT_DELAY + random.uniform(0, RATE_LIMIT_JITTER),
+        )
+        logger.debug("Rate limited, holding all callers until the cooldown ends")
+        return
+    delay = RETRY_DELAY * (2**attempt) * random.uniform(0.5, 1.5)
+    logger.debug(f"Waiting {delay:.2f} seconds before retry...")
     await asyncio.sleep(delay)
 
 
+async def wait_for_rate_limit() -> None:
+    delay = _rate_limit_until - time.monotonic()
+    if delay > 0:
+        logger.debug(f"Waiting {delay:.1f} seconds for rate-limit cooldown")
+        await asyncio.sleep(delay)
+
+
+def _apply_cache_control(messages: List[Dict[str, Any]]) -> None:
+    # Idempotent: blocks that already carry cache_control are left alone, so
+    # retries with the same messages do not stack breakpoints
+    if not messages:
+        return
+    if messages[0].get("role") == "system":
+        content = messages[0].get("content")
+        if isinstance(content, str):
+            messages[0]["content"] = [
+                {"type": "text", "text": content, "cache_control": EPHEMERAL}
+            ]
+        elif isinstance(content, list):
+            for item in content:
+                if isinstance(item, dict) and item.get("type") == "text":
+                    if "cache_control" not in item:
+                        item["cache_control"] = EPHEMERAL
+                        break  # Apply to the first text block only for system prompt
+    # One reverse pass marks the last two user messages and the last
+    # assistant message as cache breakpoints
+    users_left = 2
+    assistant_left = 1
+    for i in range(len(messages) - 1, -1, -1):
+        message = messages[i]
+        role = message.get("role")
+        if role == "user" and users_left:
+            users_left -= 1
+        elif role == "assistant" and assistant_left:
+            assistant_left -= 1
+        else:
+            continue
+        content = message.get("content")
+        if isinstance(content, str):
+            message["content"] = [
+                {"type": "text", "text": content, "cache_control": EPHEMERAL}
+            ]
+        elif isinstance(content, list):
+            for item in content:
+                if isinstance(item, dict) and item.get("type") == "text":
+                    if "cache_control" not in item:
+                        item["cache_control"] = EPHEMERAL
+        if not users_left and not assistant_left:
+            break
+
+
 def prepare_params(
     messages: List[Dict[str, Any]],
     model_name: str,
@@ -77,7 +228,7 @@ def prepare_params(
     enable_thinking: Optional[bool] = False,
     reasoning_effort: Optional[str] = "low",
 ):
-
+    meta = classify_model(model_name)
     params = {
         "model": model_name,
         "messages": messages,
@@ -93,117 +244,25 @@ def prepare_params(
     if model_id:
         params["model_id"] = model_id
     if max_tokens is not None:
-        if model_name.startswith("bedrock/") and "claude-3-7" in model_name:
+        if meta.skip_max_tokens:
             logger.debug(f"Skipping max_tokens for Claude 3.7 model: {model_name}")
         else:
-            param_name = "max_completion_tokens" if "o1" in model_name else "max_tokens"
-            params[param_name] = max_tokens
+            params[meta.max_tokens_param] = max_tokens
     if tools:
         params.update({"tools": tools, "tool_choice": tool_choice})
         logger.debug(f"Added {len(tools)} tools to API parameters")
-    if "claude" in model_name.lower() or "anthropic" in model_name.lower():
-        params["extra_headers"] = {
-            # "anthropic-beta": "max-tokens-3-5-sonnet-2024-07-15"
-            "anthropic-beta": "output-128k-2025-02-19"
-        }
-        logger.debug("Added Claude-specific headers")
-    if model_name.startswith("openrouter/"):
-        logger.debug(f"Preparing OpenRouter parameters for model: {model_name}")
-        site_url = config.OR_SITE_URL
-        app_name = config.OR_APP_NAME
-        if site_url or app_name:
-            extra_headers = params.get("extra_headers", {})
-            if site_url:
-                extra_headers["HTTP-Referer"] = site_url
-            if app_name:
-                extra_headers["X-Title"] = app_name
-            params["extra_headers"] = extra_headers
-            logger.debug(f"Added OpenRouter site URL and app name to headers")
-    if model_name.startswith("bedrock/"):
-        logger.debug(f"Preparing AWS Bedrock parameters for model: {model_name}")
-
-        if not model_id and "anthropic.claude-3-7-sonnet" in model_name:
-            params["model_id"] = (
-                "arn:aws:bedrock:us-west-2:935064898258:inference-profile/us.anthropic.claude-3-7-sonnet-20250219-v1:0"
-            )
-            logger.debug(
-                f"Auto-set model_id for Claude 3.7 Sonnet: {params['model_id']}"
-            )
-    # Use model from params if set, else original
-    effective_model_name = params.get("model", model_name)
-    if (
-        "claude" in effective_model_name.lower()
-        or "anthropic" in effective_model_name.lower()
-    ):
+    if meta.extra_headers:
+        params["extra_headers"] = dict(meta.extra_headers)
+    if not model_id and meta.bedrock_model_id:
+        params["model_id"] = meta.bedrock_model_id
+        logger.debug(f"Auto-set model_id for Claude 3.7 Sonnet: {params['model_id']}")
+    is_anthropic = meta.is_anthropic
+    if is_anthropic:
         messages = params["messages"]
         if not isinstance(messages, list):
             return params
-        if messages and messages[0].get("role") == "system":
-            content = messages[0].get("content")
-            if isinstance(content, str):
-                messages[0]["content"] = [
-                    {
-                        "type": "text",
-                        "text": content,
-                        "cache_control": {"type": "ephemeral"},
-                    }
-                ]
-            elif isinstance(content, list):
-                for item in content:
-                    if isinstance(item, dict) and item.get("type") == "text":
-                        if "cache_control" not in item:
-                            item["cache_control"] = {"type": "ephemeral"}
-                            break  # Apply to the first text block only for system prompt
-        last_user_idx = -1
-        second_last_user_idx = -1
-        last_assistant_idx = -1
-        for i in range(len(messages) - 1, -1, -1):
-            role = messages[i].get("role")
-            if role == "user":
-                if last_user_idx == -1:
-                    last_user_idx = i
-                elif second_last_user_idx == -1:
-                    second_last_user_idx = i
-            elif role == "assistant":
-                if last_assistant_idx == -1:
-                    last_assistant_idx = i
-
-            if (
-                last_user_idx != -1
-                and second_last_user_idx != -1
-                and last_assistant_idx != -1
-            ):
-                break
-
-        def apply_cache_control(message_idx: int, message_role: str):
-            if message_idx == -1:
-                return
-
-            message = messages[message_idx]
-            content = message.get("content")
-
-            if isinstance(content, str):
-                message["content"] = [
-                    {
-                        "type": "text",
-                        "text": content,
-                        "cache_control": {"type": "ephemeral"},
-                    }
-                ]
-            elif isinstance(content, list):
-                for item in content:
-                    if isinstance(item, dict) and item.get("type") == "text":
-                        if "cache_control" not in item:
-                            item["cache_control"] = {"type": "ephemeral"}
-
-        apply_cache_control(last_user_idx, "last user")
-        apply_cache_control(second_last_user_idx, "second last user")
-        apply_cache_control(last_assistant_idx, "last assistant")
+        _apply_cache_control(messages)
     use_thinking = enable_thinking if enable_thinking is not None else False
-    is_anthropic = (
-        "anthropic" in effective_model_name.lower()
-        or "claude" in effective_model_name.lower()
-    )
 
     if is_anthropic and use_thinking:
         effort_level = reasoning_effort if reasoning_effort else "low"
@@ -233,6 +292,11 @@ async def make_llm_api_call(
     enable_thinking: Optional[bool] = False,
     reasoning_effort: Optional[str] = "low",
 ) -> Union[Dict[str, Any], AsyncGenerator]:
+    global _keys_initialized
+    if not _keys_initialized:
+        # Idempotent and synchronous, so no lock is needed on the event loop
+        setup_api_keys()
+        _keys_initialized = True
     logger.info(
         f"Making LLM API call to model: {model_name} (Thinking: {enable_thinking}, Effort: {reasoning_effort})"
     )
@@ -253,21 +317,80 @@ async def make_llm_api_call(
         enable_thinking=enable_thinking,
         reasoning_effort=reasoning_effort,
     )
+    if stream:
+        return await _call_stream(params, model_name)
+
+    key = _request_key(params)
+    cacheable = params.get("temperature") == 0
+    if cacheable:
+        cached = _response_cache_get(key)
+        if cached is not None:
+            logger.debug(f"Serving cached LLM response for {model_name}")
+            # Callers may mutate the response; never hand out the cached object
+            return copy.deepcopy(cached)
+
+    # Coalesce identical concurrent requests into a single upstream call
+    inflight = _inflight.get(key)
+    if inflight is not None:
+        logger.debug(f"Joining in-flight LLM request to {model_name}")
+        # The originating caller owns the result object; joiners get a copy
+        return copy.deepcopy(await asyncio.shield(inflight))
+    task = asyncio.ensure_future(_call_with_retries(params, model_name))
+    _inflight[key] = task
+    task.add_done_callback(lambda t: _release_inflight(key, t, cacheable))
+    return await asyncio.shield(task)
+
+
+def _request_key(params: Dict[str, Any]) -> str:
+    payload = orjson.dumps(
+        params, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS, default=str
+    )
+    digest = blake2b(_CACHE_VERSION, digest_size=16)
+    digest.update(payload)
+    return digest.hexdigest()
+
+
+def _response_cache_get(key: str):
+    entry = _response_cache.get(key)
+    if entry is None:
+        return None
+    expires_at, response = entry
+    if expires_at < time.monotonic():
+        del _response_cache[key]
+        return None
+    _response_cache.move_to_end(key)
+    return response
+
+
+def _release_inflight(key: str, task: asyncio.Future, cacheable: bool) -> None:
+    _inflight.pop(key, None)
+    # Mark the result as retrieved even if every waiter was cancelled
+    if task.cancelled() or task.exception() is not None:
+        return
+    if cacheable:
+        # Snapshot before the originating caller can mutate its result
+        _response_cache[key] = (
+            time.monotonic() + LLM_CACHE_TTL,
+            copy.deepcopy(task.result()),
+        )
+        _response_cache.move_to_end(key)
+        while len(_response_cache) > LLM_CACHE_SIZE:
+            _response_cache.popitem(last=False)
+
+
+async def _call_with_retries(params: Dict[str, Any], model_name: str):
     last_error = None
     for attempt in range(MAX_RETRIES):
         try:
             logger.debug(f"Attempt {attempt + 1}/{MAX_RETRIES}")
 
+            await wait_for_rate_limit()
             response = await litellm.acompletion(**params)
             logger.debug(f"Successfully received API response from {model_name}")
             logger.debug(f"Response: {response}")
             return response
 
-        except (
-            litellm.exceptions.RateLimitError,
-            OpenAIError,
-            json.JSONDecodeError,
-        ) as e:
+        except _RETRYABLE_ERRORS as e:
             last_error = e
             await handle_error(e, attempt, MAX_RETRIES)
 
@@ -275,11 +398,52 @@ async def make_llm_api_call(
             logger.error(f"Unexpected error during API call: {str(e)}", exc_info=True)
             raise LLMError(f"API call failed: {str(e)}")
 
+    _raise_retry_error(last_error)
+
+
+async def _call_stream(params: Dict[str, Any], model_name: str) -> AsyncGenerator:
+    """Open a stream, retrying only until its first chunk arrives.
+
+    The first chunk is where connection and provider errors surface, so it is
+    pulled inside the retry loop; everything after it streams straight through.
+    """
+    last_error = None
+    for attempt in range(MAX_RETRIES):
+        try:
+            logger.debug(f"Stream attempt {attempt + 1}/{MAX_RETRIES}")
+
+            await wait_for_rate_limit()
+            response = await litellm.acompletion(**params)
+            try:
+                first_chunk = await response.__anext__()
+            except StopAsyncIteration:
+                return _relay_stream(None, response)
+            logger.debug(f"Streaming API response from {model_name}")
+            return _relay_stream(first_chunk, response)
+
+        except _RETRYABLE_ERRORS as e:
+            last_error = e
+            await handle_error(e, attempt, MAX_RETRIES)
+
+        except Exception as e:
+            logger.error(f"Unexpected error during API call: {str(e)}", exc_info=True)
+            raise LLMError(f"API call failed: {str(e)}")
+
+    _raise_retry_error(last_error)
+
+
+async def _relay_stream(first_chunk, response) -> AsyncGenerator:
+    if first_chunk is None:
+        return
+    yield first_chunk
+    async for chunk in response:
+        yield chunk
+
+
+def _raise_retry_error(last_error: Optional[Exception]):
     error_msg = f"Failed to make API call after {MAX_RETRIES} attempts"
     if last_error:
         error_msg += f". Last error: {str(last_error)}"
     logger.error(error_msg, exc_info=True)
     raise LLMRetryError(error_msg)
 
-
-setup_api_keys()
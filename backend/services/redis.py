@@ -1,6 +1,7 @@
 import asyncio
 import os
-from typing import Any, List
+from functools import lru_cache
+from typing import Any, AsyncIterator, Dict, Iterable, List, NamedTuple, Tuple
 
 import redis.asyncio as redis
 from dotenv import load_dotenv
@@ -13,24 +14,37 @@ _init_lock = asyncio.Lock()
 REDIS_KEY_TTL = 3600 * 24
 
 
-def initialize():
-    global client
+class RedisConfig(NamedTuple):
+    host: str
+    port: int
+    password: str
+    ssl: bool
+
+
+@lru_cache(maxsize=1)
+def _redis_config() -> RedisConfig:
+    """Read the Redis settings once; re-initialization reuses the snapshot."""
     load_dotenv()
+    return RedisConfig(
+        host=os.getenv("REDIS_HOST", "redis"),
+        port=int(os.getenv("REDIS_PORT", 6379)),
+        password=os.getenv("REDIS_PASSWORD", ""),
+        ssl=os.getenv("REDIS_SSL", "False").lower() == "true",
+    )
+
 
-    redis_host = os.getenv("REDIS_HOST", "redis")
-    redis_port = int(os.getenv("REDIS_PORT", 6379))
-    redis_password = os.getenv("REDIS_PASSWORD", "")
-    redis_ssl_str = os.getenv("REDIS_SSL", "False")
-    redis_ssl = redis_ssl_str.lower() == "true"
+def initialize():
+    global client
+    cfg = _redis_config()
 
-    logger.info(f"Initializing Redis connection to {redis_host}:{redis_port}")
+    logger.info(f"Initializing Redis connection to {cfg.host}:{cfg.port}")
 
     # Create Redis client with basic configuration
     client = redis.Redis(
-        host=redis_host,
-        port=redis_port,
-        password=redis_password,
-        ssl=redis_ssl,
+        host=cfg.host,
+        port=cfg.port,
+        password=cfg.password,
+        ssl=cfg.ssl,
         decode_responses=True,
         socket_timeout=5.0,
         socket_connect_timeout=5.0,
@@ -77,3 +91,73 @@ async def close():
         client = None
         _initialized = False
         logger.info("Redis connection closed")
+
+
+async def get_client() -> redis.Redis:
+    if client is None or not _initialized:
+        await initialize_async()
+    return client
+
+
+async def set(key: str, value: str, ex: int = None):
+    redis_client = await get_client()
+    return await redis_client.set(key, value, ex=ex)
+
+
+async def get(key: str, default: str = None):
+    redis_client = await get_client()
+    result = await redis_client.get(key)
+    return result if result is not None else default
+
+
+async def scan_iter(match: str, count: int = 500) -> AsyncIterator[str]:
+    """Iterate keys matching a pattern with SCAN instead of blocking KEYS."""
+    redis_client = await get_client()
+    async for key in redis_client.scan_iter(match=match, count=count):
+        yield key
+
+
+async def publish(channel: str, message: str):
+    redis_client = await get_client()
+    return await redis_client.publish(channel, message)
+
+
+async def expire(key: str, time: int):
+    redis_client = await get_client()
+    return await redis_client.expire(key, time)
+
+
+async def delete(key: str):
+    redis_client = await get_client()
+    return await redis_client.delete(key)
+
+
+async def create_pubsub():
+    redis_client = await get_client()
+    return redis_client.pubsub()
+
+
+async def pipeline_execute(ops: Iterable[Tuple[str, tuple, dict]]) -> List[Any]:
+    """Run ``(command, args, kwargs)`` triples in one non-transactional round trip."""
+    redis_client = await get_client()
+    async with redis_client.pipeline(transaction=False) as pipe:
+        for name, args, kwargs in ops:
+            getattr(pipe, name)(*args, **kwargs)
+        return await pipe.execute()
+
+
+async def mget_many(keys: List[str], default: str = None) -> List[Any]:
+    if not keys:
+        return []
+    redis_client = await get_client()
+    return [
+        value if value is not None else default
+        for value in await redis_client.mget(keys)
+    ]
+
+
+async def mset_with_ttl(pairs: Dict[str, str], ttl: int = REDIS_KEY_TTL) -> List[Any]:
+    """SET every pair with the same expiry in a single round trip."""
+    return await pipeline_execute(
+        ("set", (key, value), {"ex": ttl}) for key, value in pairs.items()
+    )
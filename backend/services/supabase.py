@@ -1,17 +1,26 @@
+import asyncio
 import base64
 import uuid
 from datetime import datetime
 from typing import Optional
 
-from supabase import AsyncClient, create_async_client
+import httpx
+from supabase import AsyncClient, AsyncClientOptions, create_async_client
 from utils.config import config
 from utils.logger import logger
 
+# One keep-alive pool shared by every Supabase request in the process
+HTTP_POOL_LIMITS = httpx.Limits(
+    max_connections=50, max_keepalive_connections=20, keepalive_expiry=30.0
+)
+
 
 class DBConnection:
     _instance: Optional["DBConnection"] = None
     _initialized = False
     _client: Optional[AsyncClient] = None
+    _http_client: Optional[httpx.AsyncClient] = None
+    _init_lock = asyncio.Lock()
 
     def __new__(cls):
         if cls._instance is None:
@@ -24,7 +33,12 @@ class DBConnection:
     async def initialize(self):
         if self._initialized:
             return
+        async with self._init_lock:
+            if self._initialized:
+                return
+            await self._create_client()
 
+    async def _create_client(self):
         try:
             supabase_url = config.SUPABASE_URL
             # Use service role key preferentially for backend operations
@@ -39,7 +53,18 @@ class DBConnection:
                 )
 
             logger.debug("Initializing Supabase connection")
-            self._client = await create_async_client(supabase_url, supabase_key)
+            http_client = httpx.AsyncClient(limits=HTTP_POOL_LIMITS)
+            try:
+                options = AsyncClientOptions(httpx_client=http_client)
+                self._http_client = http_client
+            except TypeError:
+                # Older supabase releases cannot take an injected httpx client
+                logger.debug("Supabase client does not accept httpx_client, using its own pool")
+                await http_client.aclose()
+                options = AsyncClientOptions()
+            self._client = await create_async_client(
+                supabase_url, supabase_key, options=options
+            )
             self._initialized = True
             key_type = (
                 "SERVICE_ROLE_KEY" if config.SUPABASE_SERVICE_ROLE_KEY else "ANON_KEY"
@@ -49,10 +74,17 @@ class DBConnection:
             )
         except Exception as e:
             logger.error(f"Database initialization error: {e}")
+            # The next initialize() retries from scratch, so don't leak this pool
+            if self._http_client is not None:
+                await self._http_client.aclose()
+                self._http_client = None
             raise RuntimeError(f"Failed to initialize database connection: {str(e)}")
 
     @property
     async def client(self) -> AsyncClient:
+        # Fast path: the client is created once and shared by every caller
+        if self._client is not None:
+            return self._client
         if not self._initialized:
             logger.debug("Supabase client not initialized, initializing now")
             await self.initialize()
@@ -0,0 +1,45 @@
+BEGIN;
+
+-- Resolve thread existence, project visibility and account membership in one round-trip
+CREATE OR REPLACE FUNCTION verify_thread_access(p_thread_id UUID, p_user_id UUID)
+RETURNS JSONB
+SECURITY DEFINER
+SET search_path = public, basejump
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_project_id UUID;
+    v_account_id UUID;
+    v_is_public BOOLEAN;
+    v_is_member BOOLEAN;
+BEGIN
+    SELECT t.project_id, t.account_id, COALESCE(p.is_public, FALSE)
+    INTO v_project_id, v_account_id, v_is_public
+    FROM threads t
+    LEFT JOIN projects p ON p.project_id = t.project_id
+    WHERE t.thread_id = p_thread_id;
+
+    IF NOT FOUND THEN
+        RETURN jsonb_build_object('found', FALSE, 'authorized', FALSE);
+    END IF;
+
+    SELECT EXISTS (
+        SELECT 1 FROM basejump.account_user au
+        WHERE au.account_id = v_account_id
+        AND au.user_id = p_user_id
+    ) INTO v_is_member;
+
+    RETURN jsonb_build_object(
+        'found', TRUE,
+        'authorized', v_is_public OR v_is_member,
+        'project_id', v_project_id,
+        'account_id', v_account_id,
+        'is_public', v_is_public
+    );
+END;
+$$;
+
+REVOKE EXECUTE ON FUNCTION verify_thread_access(UUID, UUID) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION verify_thread_access(UUID, UUID) TO service_role;
+
+COMMIT;
@@ -0,0 +1,48 @@
+BEGIN;
+
+-- Create the project, thread, initial user message and agent run atomically
+CREATE OR REPLACE FUNCTION initiate_agent(
+    p_project_id UUID,
+    p_account_id UUID,
+    p_project_name TEXT,
+    p_sandbox JSONB,
+    p_message_content JSONB,
+    p_created_at TIMESTAMP WITH TIME ZONE DEFAULT TIMEZONE('utc'::text, NOW()),
+    p_thread_agent_id UUID DEFAULT NULL,
+    p_thread_metadata JSONB DEFAULT '{}'::jsonb
+)
+RETURNS JSONB
+SECURITY DEFINER
+SET search_path = public
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_thread_id UUID;
+    v_agent_run_id UUID;
+BEGIN
+    INSERT INTO projects (project_id, account_id, name, sandbox, created_at)
+    VALUES (p_project_id, p_account_id, p_project_name, p_sandbox, p_created_at);
+
+    INSERT INTO threads (project_id, account_id, agent_id, metadata, created_at)
+    VALUES (p_project_id, p_account_id, p_thread_agent_id, COALESCE(p_thread_metadata, '{}'::jsonb), p_created_at)
+    RETURNING thread_id INTO v_thread_id;
+
+    INSERT INTO messages (thread_id, type, is_llm_message, content, created_at)
+    VALUES (v_thread_id, 'user', TRUE, p_message_content, p_created_at);
+
+    INSERT INTO agent_runs (thread_id, status, started_at)
+    VALUES (v_thread_id, 'running', p_created_at)
+    RETURNING id INTO v_agent_run_id;
+
+    RETURN jsonb_build_object(
+        'project_id', p_project_id,
+        'thread_id', v_thread_id,
+        'agent_run_id', v_agent_run_id
+    );
+END;
+$$;
+
+REVOKE EXECUTE ON FUNCTION initiate_agent(UUID, UUID, TEXT, JSONB, JSONB, TIMESTAMP WITH TIME ZONE, UUID, JSONB) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION initiate_agent(UUID, UUID, TEXT, JSONB, JSONB, TIMESTAMP WITH TIME ZONE, UUID, JSONB) TO service_role;
+
+COMMIT;
@@ -1,8 +1,53 @@
-from typing import Optional
+import asyncio
+import base64
+import binascii
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
 
-import jwt
+import orjson
 from fastapi import HTTPException, Request
-from jwt.exceptions import PyJWTError
+
+# token -> (user_id, expires_at); LRU-bounded, entries never outlive the token
+_TOKEN_CACHE_MAXSIZE = 10_000
+_TOKEN_CACHE_TTL = 60
+_token_cache: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+
+
+def _decode_payload(token: str) -> dict:
+    """Parse a JWT's claims segment without verifying the signature.
+
+    Equivalent to ``jwt.decode(token, options={"verify_signature": False})``,
+    without PyJWT's header and option handling.
+    """
+    _, payload, _ = token.split(".", 2)
+    payload = orjson.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+    if not isinstance(payload, dict):
+        raise ValueError("JWT payload is not an object")
+    return payload
+
+
+def _cached_user_id(token: str, now: float) -> Optional[str]:
+    cached = _token_cache.get(token)
+    if cached is None:
+        return None
+    if cached[1] <= now:
+        del _token_cache[token]
+        return None
+    _token_cache.move_to_end(token)
+    return cached[0]
+
+
+def _cache_user_id(token: str, user_id: str, payload: dict, now: float) -> None:
+    expires_at = now + _TOKEN_CACHE_TTL
+    exp = payload.get("exp")
+    if isinstance(exp, (int, float)):
+        expires_at = min(expires_at, exp)
+    if expires_at <= now:
+        return
+    _token_cache[token] = (user_id, expires_at)
+    if len(_token_cache) > _TOKEN_CACHE_MAXSIZE:
+        _token_cache.popitem(last=False)
 
 
 async def get_current_user_id_from_jwt(request: Request) -> str:
@@ -14,9 +59,13 @@ async def get_current_user_id_from_jwt(request: Request) -> str:
             headers={"WWW-Authenticate": "Bearer"},
         )
     token = auth_header.split(" ")[1]
+    now = time.time()
+    cached = _cached_user_id(token, now)
+    if cached is not None:
+        return cached
     try:
 
-        payload = jwt.decode(token, options={"verify_signature": False})
+        payload = _decode_payload(token)
 
         user_id = payload.get("sub")
 
@@ -27,9 +76,10 @@ async def get_current_user_id_from_jwt(request: Request) -> str:
                 headers={"WWW-Authenticate": "Bearer"},
             )
 
+        _cache_user_id(token, user_id, payload, now)
         return user_id
 
-    except PyJWTError:
+    except (ValueError, binascii.Error):
         raise HTTPException(
             status_code=401,
             detail="Invalid token",
@@ -37,26 +87,92 @@ async def get_current_user_id_from_jwt(request: Request) -> str:
         )
 
 
-async def get_account_id_from_thread(client, thread_id: str) -> str:
-    try:
-        response = (
-            await client.table("threads")
-            .select("account_id")
-            .eq("thread_id", thread_id)
-            .execute()
-        )
-        if not response.data or len(response.data) == 0:
-            raise HTTPException(status_code=404, detail="Thread not found")
+class ThreadAccountLoader:
+    """Coalesce thread -> account_id lookups made in the same loop tick into one query."""
 
-        account_id = response.data[0].get("account_id")
+    def __init__(self):
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._client = None
+        self._scheduled = False
+        self._tasks: set = set()
 
-        if not account_id:
-            raise HTTPException(
-                status_code=500, detail="Thread has no associated account"
+    def load(self, client, thread_id: str) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        future = self._pending.get(thread_id)
+        if future is None:
+            future = loop.create_future()
+            self._pending[thread_id] = future
+        self._client = client
+        if not self._scheduled:
+            self._scheduled = True
+            loop.call_soon(self._dispatch)
+        return future
+
+    def _dispatch(self):
+        pending, self._pending = self._pending, {}
+        self._scheduled = False
+        task = asyncio.create_task(self._fetch(self._client, pending))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _fetch(self, client, pending: Dict[str, asyncio.Future]):
+        try:
+            response = (
+                await client.table("threads")
+                .select("thread_id, account_id")
+                .in_("thread_id", list(pending))
+                .execute()
             )
+        except Exception as e:
+            for future in pending.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        account_ids = {row["thread_id"]: row.get("account_id") for row in response.data or []}
+        for thread_id, future in pending.items():
+            if future.done():
+                continue
+            if thread_id not in account_ids:
+                future.set_exception(HTTPException(status_code=404, detail="Thread not found"))
+            elif not account_ids[thread_id]:
+                future.set_exception(
+                    HTTPException(status_code=500, detail="Thread has no associated account")
+                )
+            else:
+                future.set_result(account_ids[thread_id])
+
+
+_thread_account_loader = ThreadAccountLoader()
+
+# thread_id -> (account_id, expires_at); a thread's account never changes in practice
+_THREAD_ACCOUNT_CACHE_MAXSIZE = 10_000
+_THREAD_ACCOUNT_CACHE_TTL = 600
+_thread_account_cache: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
 
-        return account_id
+
+def invalidate_thread_account(thread_id: str) -> None:
+    """Drop a cached account_id, for callers that move a thread between accounts."""
+    _thread_account_cache.pop(thread_id, None)
+
+
+async def get_account_id_from_thread(client, thread_id: str) -> str:
+    now = time.monotonic()
+    cached = _thread_account_cache.get(thread_id)
+    if cached is not None:
+        if cached[1] > now:
+            _thread_account_cache.move_to_end(thread_id)
+            return cached[0]
+        del _thread_account_cache[thread_id]
+    try:
+        # Concurrent misses for one thread share the loader's future, so a
+        # cold entry costs a single query
+        account_id = await _thread_account_loader.load(client, thread_id)
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"Error retrieving thread information: {str(e)}"
         )
+    _thread_account_cache[thread_id] = (account_id, now + _THREAD_ACCOUNT_CACHE_TTL)
+    if len(_thread_account_cache) > _THREAD_ACCOUNT_CACHE_MAXSIZE:
+        _thread_account_cache.popitem(last=False)
+    return account_id
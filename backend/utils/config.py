@@ -39,11 +39,20 @@ class Configuration:
     STRIPE_TIER_125_800_ID_STAGING: str = "price_1RIKNrG6l1KZGqIrjKT0yGvI"
     STRIPE_TIER_200_1000_ID_STAGING: str = "price_1RIKQ2G6l1KZGqIrum9n8SI7"
 
+    # LLM API keys
+    ANTHROPIC_API_KEY: Optional[str] = None
+    OPENAI_API_KEY: Optional[str] = None
+    GROQ_API_KEY: Optional[str] = None
     OPENROUTER_API_KEY: Optional[str] = None
     OPENROUTER_API_BASE: Optional[str] = "https://openrouter.ai/api/v1"
     OR_SITE_URL: Optional[str] = "https://kortix.ai"
     OR_APP_NAME: Optional[str] = "Kortix AI"
 
+    # AWS Bedrock credentials
+    AWS_ACCESS_KEY_ID: Optional[str] = None
+    AWS_SECRET_ACCESS_KEY: Optional[str] = None
+    AWS_REGION_NAME: Optional[str] = None
+
     MODEL_TO_USE: Optional[str] = "anthropic/claude-3-7-sonnet-latest"
 
     SUPABASE_URL: str
@@ -69,6 +78,19 @@ class Configuration:
     SANDBOX_ENTRYPOINT = (
         "/usr/bin/supervisord -n -c /etc/supervisor/conf.d/supervisord.conf"
     )
+    # Started sandboxes kept ready for new projects; 0 disables the pool.
+    # Per worker process: total warm sandboxes = SANDBOX_POOL_SIZE * WEB_CONCURRENCY
+    SANDBOX_POOL_SIZE: int = 0
+    SANDBOX_POOL_MAX_AGE: int = 1800
+    SANDBOX_MAX_CONCURRENT_OPS: int = 10
+    # Sandboxes slower than this to restore from archive stay stopped-not-archived
+    # for SANDBOX_WARM_ARCHIVE_INTERVAL minutes
+    SANDBOX_SLOW_START_SECONDS: int = 10
+    SANDBOX_WARM_ARCHIVE_INTERVAL: int = 7 * 24 * 60
+
+    # API worker processes; per-process pools are sized from this so the host
+    # total stays flat as workers are added
+    WEB_CONCURRENCY: int = 1
 
     LANGFUSE_PUBLIC_KEY: Optional[str] = None
     LANGFUSE_SECRET_KEY: Optional[str] = None
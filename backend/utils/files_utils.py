@@ -1,58 +1,76 @@
-import os
-
-EXCLUDED_FILES = {
-    ".DS_Store",
-    ".gitignore",
-    "package-lock.json",
-    "postcss.config.js",
-    "postcss.config.mjs",
-    "jsconfig.json",
-    "components.json",
-    "tsconfig.tsbuildinfo",
-    "tsconfig.json",
-}
-
-EXCLUDED_DIRS = {"node_modules", ".next", "dist", "build", ".git"}
-
-EXCLUDED_EXT = {
-    ".ico",
-    ".svg",
-    ".png",
-    ".jpg",
-    ".jpeg",
-    ".gif",
-    ".bmp",
-    ".tiff",
-    ".webp",
-    ".db",
-    ".sql",
-}
+import re
+from functools import lru_cache
+
+EXCLUDED_FILES = frozenset(
+    {
+        ".DS_Store",
+        ".gitignore",
+        "package-lock.json",
+        "postcss.config.js",
+        "postcss.config.mjs",
+        "jsconfig.json",
+        "components.json",
+        "tsconfig.tsbuildinfo",
+        "tsconfig.json",
+    }
+)
+
+EXCLUDED_DIRS = frozenset({"node_modules", ".next", "dist", "build", ".git"})
+# Whole path components only, so e.g. "rebuild/" or "distance/" aren't excluded
+_EXCLUDED_DIR_RE = re.compile(
+    "(?:^|/)(?:" + "|".join(re.escape(d) for d in sorted(EXCLUDED_DIRS)) + ")(?:/|$)"
+)
+
+EXCLUDED_EXT = frozenset(
+    {
+        ".ico",
+        ".svg",
+        ".png",
+        ".jpg",
+        ".jpeg",
+        ".gif",
+        ".bmp",
+        ".tiff",
+        ".webp",
+        ".db",
+        ".sql",
+    }
+)
 
 
 def should_exclude_file(rel_path: str) -> bool:
-    filename = os.path.basename(rel_path)
+    # Sandbox paths are POSIX, so plain string splits replace os.path calls
+    dir_path, _, filename = rel_path.rpartition("/")
+
+    # Cheapest checks first: extension and filename are set lookups
+    # (leading dots mark hidden files, as in os.path.splitext)
+    name, dot, ext = filename.rpartition(".")
+    if dot and name.lstrip(".") and f".{ext}".lower() in EXCLUDED_EXT:
+        return True
     if filename in EXCLUDED_FILES:
         return True
 
     # Check directory
-    dir_path = os.path.dirname(rel_path)
-    if any(excluded in dir_path for excluded in EXCLUDED_DIRS):
-        return True
-
-    # Check extension
-    _, ext = os.path.splitext(filename)
-    if ext.lower() in EXCLUDED_EXT:
+    if dir_path and _EXCLUDED_DIR_RE.search(dir_path):
         return True
 
     return False
 
 
+@lru_cache(maxsize=4)
+def _workspace_prefix(workspace_path: str) -> str:
+    return workspace_path.strip("/") + "/"
+
+
 def clean_path(path: str, workspace_path: str = "/workspace") -> str:
     path = path.lstrip("/")
-    if path.startswith(workspace_path.lstrip("/")):
-        path = path[len(workspace_path.lstrip("/")) :]
-    if path.startswith("workspace/"):
-        path = path[9:]
-    path = path.lstrip("/")
-
-    return path
+    prefix = _workspace_prefix(workspace_path)
+    if path == prefix[:-1]:
+        return ""
+    # removeprefix returns the same object when nothing matched
+    stripped = path.removeprefix(prefix)
+    if stripped is path:
+        stripped = path.removeprefix("workspace/")
+        if stripped is path:
+            return path
+    return stripped.lstrip("/")
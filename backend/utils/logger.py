@@ -1,55 +1,103 @@
-import json
+import atexit
+import copy
 import logging
 import os
+import queue
 import sys
 import traceback
 from contextvars import ContextVar
-from datetime import datetime, timezone
-from logging.handlers import RotatingFileHandler
+from datetime import datetime, timedelta
+from logging.handlers import (MemoryHandler, QueueHandler, QueueListener,
+                              RotatingFileHandler)
+
+import orjson
 
 from utils.config import EnvMode, config
 
 request_id: ContextVar[str] = ContextVar("request_id", default="")
+LOG_DIR = os.path.join(os.getcwd(), "logs")
+# Naive UTC epoch; utcfromtimestamp() is deprecated from Python 3.12
+_UTC_EPOCH = datetime(1970, 1, 1)
+
+
+class RequestIdFilter(logging.Filter):
+    """Stamp each record with the current request id before it is queued.
+
+    The ContextVar is only visible on the emitting task, not on the queue
+    listener thread that formats the record.
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id.get()
+        return True
+
+
+class _RawQueueHandler(QueueHandler):
+    """Enqueue records with their message merged but exc_info intact.
+
+    The message is rendered on the calling thread so mutable args are logged
+    as they were at the call. Unlike the stock prepare(), the traceback is left
+    to the listener's handlers so JSONFormatter keeps its exception field.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
 
 
 class JSONFormatter(logging.Formatter):
     def format(self, record: logging.LogRecord) -> str:
+        # Optional fields arrive via `extra=` or filters straight into __dict__
+        fields = record.__dict__
         log_data = {
-            "timestamp": datetime.now(timezone.utc).replace(tzinfo=None).isoformat(),
+            # When the record was created, not when the listener thread formats
+            # it; orjson renders naive datetimes in ISO format natively
+            "timestamp": _UTC_EPOCH + timedelta(seconds=record.created),
             "level": record.levelname,
             "message": record.getMessage(),
             "module": record.module,
             "function": record.funcName,
             "line": record.lineno,
-            "request_id": request_id.get(),
-            "thread_id": getattr(record, "thread_id", None),
-            "correlation_id": getattr(record, "correlation_id", None),
+            "request_id": fields.get("request_id", ""),
+            "thread_id": fields.get("thread_id"),
+            "correlation_id": fields.get("correlation_id"),
         }
-        if hasattr(record, "extra"):
-            log_data.update(record.extra)
+        extra = fields.get("extra")
+        if extra is not None:
+            log_data.update(extra)
         if record.exc_info:
+            # exc_info survives the queue (see _RawQueueHandler); format the
+            # traceback once per record, however many handlers use this formatter
+            exc_traceback = fields.get("_exc_traceback")
+            if exc_traceback is None:
+                exc_traceback = traceback.format_exception(*record.exc_info)
+                record._exc_traceback = exc_traceback
             log_data["exception"] = {
                 "type": str(record.exc_info[0].__name__),
                 "message": str(record.exc_info[1]),
-                "traceback": traceback.format_exception(*record.exc_info),
+                "traceback": exc_traceback,
             }
 
-        return json.dumps(log_data)
+        return orjson.dumps(log_data, default=str).decode()
 
 
 def setup_logger(name: str = "agentpress") -> logging.Logger:
 
     logger = logging.getLogger(name)
+    # Already configured: attaching a second queue would duplicate every record
+    if logger.handlers:
+        return logger
     logger.setLevel(logging.DEBUG)
+    handlers = []
 
     # Create logs directory if it doesn't exist
-    log_dir = os.path.join(os.getcwd(), "logs")
+    log_dir = LOG_DIR
     try:
-        if not os.path.exists(log_dir):
-            os.makedirs(log_dir)
-            print(f"Created log directory at: {log_dir}")
-    except Exception as e:
-        print(f"Error creating log directory: {e}")
+        os.makedirs(log_dir, exist_ok=True)
+    except OSError as e:
+        sys.__stderr__.write(f"Error creating log directory: {e}\n")
         return logger
 
     # File handler with rotation
@@ -68,13 +116,22 @@ def setup_logger(name: str = "agentpress") -> logging.Logger:
         )
         file_handler.setFormatter(file_formatter)
 
-        # Add file handler to logger
-        logger.addHandler(file_handler)
-        print(f"Added file handler for: {log_file}")
+        # Batch file writes; errors and above still flush immediately
+        buffered_handler = MemoryHandler(
+            capacity=1024,
+            flushLevel=logging.ERROR,
+            target=file_handler,
+            flushOnClose=True,
+        )
+        buffered_handler.setLevel(logging.DEBUG)
+        atexit.register(buffered_handler.flush)
+
+        handlers.append(buffered_handler)
     except Exception as e:
-        print(f"Error setting up file handler: {e}")
+        sys.__stderr__.write(f"Error setting up file handler: {e}\n")
 
     # Console handler - WARNING in production, DEBUG in other environments
+    console_handler = None
     try:
         console_handler = logging.StreamHandler(sys.stdout)
         if config.ENV_MODE == EnvMode.PRODUCTION:
@@ -87,12 +144,21 @@ def setup_logger(name: str = "agentpress") -> logging.Logger:
         )
         console_handler.setFormatter(console_formatter)
 
-        # Add console handler to logger
-        logger.addHandler(console_handler)
+        handlers.append(console_handler)
+    except Exception as e:
+        sys.__stderr__.write(f"Error setting up console handler: {e}\n")
+
+    # Callers only enqueue records; formatting and I/O run on the listener thread
+    log_queue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    queue_handler = _RawQueueHandler(log_queue)
+    queue_handler.addFilter(RequestIdFilter())
+    logger.addHandler(queue_handler)
+    if console_handler is not None:
         logger.info(f"Added console handler with level: {console_handler.level}")
         logger.info(f"Log file will be created at: {log_dir}")
-    except Exception as e:
-        print(f"Error setting up console handler: {e}")
 
     return logger
 